@@ -1,50 +1,276 @@
 from __future__ import annotations
+import typing
+import threading
+import weakref
+from types import MappingProxyType
 from typing import Any
 from Types import Callable, ExpressionBioledMethod
 
+CALL_CACHE_SIZE = 256
+
+# Returned by dict.get for names that are not there
+_missing = object()
+
+
+class _EvaluationState(threading.local):
+    """What is being evaluated on each thread, so that threads evaluating at the same time do not mix their dependencies."""
+    def __init__(self):
+        # One set per lazy variable or memoized call being evaluated, innermost last:
+        # the (environment, name) of every variable it looks up
+        self.dependencies: list[set[tuple[Environment, str]]] = []
+
+_evaluation = _EvaluationState()
+
+# How many evaluations are running on all threads, so that lookups outside any evaluation skip the per-thread state
+_evaluations_running = 0
+_evaluations_lock = threading.Lock()
+
+
+def _begin_evaluation() -> list[set[tuple[Environment, str]]]:
+    global _evaluations_running
+    with _evaluations_lock:
+        _evaluations_running += 1
+    evaluating = _evaluation.dependencies
+    evaluating.append(set())
+    return evaluating
+
+
+def _end_evaluation(evaluating: list[set[tuple[Environment, str]]]) -> set[tuple[Environment, str]]:
+    global _evaluations_running
+    with _evaluations_lock:
+        _evaluations_running -= 1
+    return evaluating.pop()
+
+
+def _record_dependency(environment: Environment, name: str):
+    evaluating = _evaluation.dependencies
+    if evaluating:
+        evaluating[-1].add((environment, name))
+
 class Environment:
     """
     A class that represents the environment of a C# file.
     Contains the global variables and methods.
     """
+    # Whether the environment is a FrozenEnvironment, which enclosed environments copy names into before assigning them
+    frozen = False
+
     def __init__(self, enclosing: Environment | None = None):
         self.enclosing = enclosing
         self.values: dict[str, Any] = {}
+        # Variables whose value is computed the first time they are looked up, in definition order
+        self.lazy_values: dict[str, typing.Callable[[], Any]] = {}
+        # How each lazy variable is computed, kept to compute it again when a variable it depends on changes
+        self.lazy_definitions: dict[str, typing.Callable[[], Any]] = {}
+        # For each variable, the lazy variables computed from it, by the environment they are defined in
+        self.dependents: dict[str, weakref.WeakKeyDictionary[Environment, set[str]]] = {}
         self.callables: dict[str, Callable] = {}
         self.classes: dict[str, Callable] = {}
+        # The enclosing environment each variable and method name was found in. Values are not cached, only where
+        # they live, so reassignments do not invalidate anything; a name defined in between drops the entry.
+        self._variable_scopes: dict[str, Environment | None] = {}
+        self._method_scopes: dict[str, Environment | None] = {}
+        # The environments directly enclosed by this one that have cached lookups, created by the first of them
+        self._lookers: weakref.WeakSet[Environment] | None = None
+        self._registered = False
+        # Bumped whenever a name is defined or a value changes here, see chain_version()
+        self._version = 0
+        # Results of the expression-bodied methods defined here, created on the first call
+        self.call_cache: CallCache | None = None
 
     def define_variable(self, name: str, value: Any):
+        self.lazy_values.pop(name, None)
+        self.lazy_definitions.pop(name, None)
+        self.values[name] = value
+        self._changed(name, self._variable_scopes)
+        self._invalidate_dependents(name)
+
+    def define_lazy_variable(self, name: str, evaluate: typing.Callable[[], Any]):
+        """
+        Define a variable whose value is computed by evaluate() when it is first looked up, and memoized.
+        The memoized value is dropped, to be computed again, when a variable it was computed from is assigned.
+        """
+        self.values.pop(name, None)
+        self.lazy_values[name] = evaluate
+        self.lazy_definitions[name] = evaluate
+        self._changed(name, self._variable_scopes)
+        self._invalidate_dependents(name)
+
+    def evaluate_lazy_variables(self, names: typing.Iterable[str] | None = None):
+        """Compute the given lazy variables, or all of them, that have not been looked up yet, in definition order."""
+        for name in list(self.lazy_values if names is None else names):
+            if name in self.lazy_values:
+                self._evaluate_lazy_variable(name)
+
+    def _evaluate_lazy_variable(self, name: str) -> Any:
+        # Removed before evaluating, so that a variable referring back to itself resolves in the enclosing scopes
+        evaluate = self.lazy_values.pop(name)
+        evaluating = _begin_evaluation()
+        try:
+            value = evaluate()
+        finally:
+            dependencies = _end_evaluation(evaluating)
         self.values[name] = value
+        for environment, dependency in dependencies:
+            environment.dependents.setdefault(dependency, weakref.WeakKeyDictionary()).setdefault(self, set()).add(name)
+        return value
+
+    def _invalidate_dependents(self, name: str):
+        """Drop the memoized values computed from this variable, and from those values, recursively."""
+        if name not in self.dependents:
+            return
+        for environment, dependent_names in list(self.dependents.pop(name).items()):
+            for dependent in dependent_names:
+                if dependent in environment.lazy_definitions and dependent in environment.values:
+                    del environment.values[dependent]
+                    environment.lazy_values[dependent] = environment.lazy_definitions[dependent]
+                    environment._changed(dependent, environment._variable_scopes)
+                    environment._invalidate_dependents(dependent)
+
+    def _changed(self, name: str, scopes: dict[str, Environment | None]):
+        # The name now resolves here rather than where this environment's own lookup,
+        # or those of the environments it encloses, may have cached it
+        scopes.pop(name, None)
+        self._version += 1
+        self._drop_lookups(name)
+
+    def _drop_lookups(self, name: str):
+        """Drop the cached lookups of a name in the enclosed environments, which resolved it through this one."""
+        if not self._lookers:
+            return
+        for environment in list(self._lookers):
+            dropped_variable = environment._variable_scopes.pop(name, _missing) is not _missing
+            dropped_method = environment._method_scopes.pop(name, _missing) is not _missing
+            if dropped_variable or dropped_method:
+                environment._drop_lookups(name)
+
+    def chain_version(self) -> int:
+        """A number that changes whenever a name is defined or a value changes in this environment or one enclosing it."""
+        version = 0
+        environment: Environment | None = self
+        while environment is not None:
+            version += environment._version
+            environment = environment.enclosing
+        return version
+
+    def _find_scope(self, name: str, attribute: str) -> Environment | None:
+        """
+        The closest enclosing environment with the name in the given attribute (values or callables),
+        found from the lookup cached in the enclosing environment, and cached here.
+        """
+        enclosing = self.enclosing
+        if enclosing is None:
+            return None
+        scopes_attribute = "_variable_scopes" if attribute == "values" else "_method_scopes"
+        if name in getattr(enclosing, attribute) or (attribute == "values" and name in enclosing.lazy_values):
+            scope = enclosing
+        elif enclosing.frozen:
+            # A frozen environment encloses nothing, and caches nothing
+            scope = None
+        else:
+            scope = getattr(enclosing, scopes_attribute).get(name, _missing)
+            if scope is _missing:
+                scope = enclosing._find_scope(name, attribute)
+        if not enclosing.frozen and not self._registered:
+            # So that a definition in, or above, the enclosing environment drops what is cached here
+            if enclosing._lookers is None:
+                enclosing._lookers = weakref.WeakSet()
+            enclosing._lookers.add(self)
+            self._registered = True
+        getattr(self, scopes_attribute)[name] = scope
+        return scope
 
     def assign_variable(self, name: str, value: Any):
-        if name in self.values:
-            self.values[name] = value
+        if name in self.values or name in self.lazy_values:
+            self.define_variable(name, value)
+        elif self.enclosing is not None and self.enclosing.frozen and name in self.enclosing.values:
+            # Copy on write: the assignment shadows the shared variable instead of changing it
+            self.define_variable(name, value)
         elif self.enclosing is not None:
             self.enclosing.assign_variable(name, value)
         else:
             raise Exception(f"Variable {name} not found")
     
     def get_variable(self, name: str):
-        if name in self.values:
-            return self.values[name]
-        elif self.enclosing is not None:
-            return self.enclosing.get_variable(name)
-        else:
+        value = self.values.get(name, _missing)
+        if value is not _missing:
+            if _evaluations_running:
+                _record_dependency(self, name)
+            return value
+        # Names defined here are never in the cache, so it is read before lazy_values
+        scope = self._variable_scopes.get(name, _missing)
+        if scope is _missing:
+            if name in self.lazy_values:
+                value = self._evaluate_lazy_variable(name)
+                if _evaluations_running:
+                    _record_dependency(self, name)
+                return value
+            scope = self._find_scope(name, "values")
+        if scope is None:
             # raise Exception(f"Variable {name} not found")
-            pass
+            return None
+        value = scope.values.get(name, _missing)
+        if value is _missing:
+            # A lazy variable not computed yet, or being computed, is looked up in its scope
+            return scope.get_variable(name)
+        if _evaluations_running:
+            # Nothing in a frozen scope changes: an assignment copies the variable into the environment it directly
+            # encloses, so the dependency is recorded there, where that assignment invalidates it
+            _record_dependency(self._enclosed_by(scope) if scope.frozen else scope, name)
+        return value
+
+    def _enclosed_by(self, scope: Environment) -> Environment:
+        """The environment in this one's chain that scope directly encloses."""
+        environment = self
+        while environment.enclosing is not scope:
+            environment = environment.enclosing
+        return environment
     
     def define_method(self, name: str, method: Callable):
         self.callables[name] = method
+        self._changed(name, self._method_scopes)
         if method.arity == 0 and isinstance(method, ExpressionBioledMethod):
-            # if the method has no arguments, it is could be seen as a variable
+            # if the method has no arguments, it is could be seen as a variable, computed when it is first read
             from Interpreter import Interpreter
-            self.define_variable(name, method.call(Interpreter(self), []))
+            self.define_lazy_variable(name, lambda: method.call(Interpreter(self), []))
+
+    def call_memoized(self, method: Callable, arguments: list[Any], evaluate: typing.Callable[[], Any]) -> Any:
+        """
+        Return evaluate(), the result of calling a method defined in this environment, memoized by method and arguments.
+        The variables the call looked up are replayed into the lazy variable being evaluated, if any, on a hit.
+        """
+        try:
+            key = (method, tuple(arguments), self.chain_version())
+            hash(key)
+        except TypeError:
+            return evaluate()
+        if self.call_cache is None:
+            self.call_cache = CallCache()
+        entry = self.call_cache.get(key)
+        if entry is None:
+            evaluating = _begin_evaluation()
+            try:
+                result = evaluate()
+            finally:
+                dependencies = _end_evaluation(evaluating)
+            entry = (result, dependencies)
+            self.call_cache.put(key, entry)
+        result, dependencies = entry
+        if _evaluations_running:
+            evaluating = _evaluation.dependencies
+            if evaluating:
+                evaluating[-1].update(dependencies)
+        return result
 
     def get_method(self, name: str):
-        if name in self.callables:
-            return self.callables[name]
-        elif self.enclosing is not None:
-            return self.enclosing.get_method(name)
+        method = self.callables.get(name)
+        if method is not None:
+            return method
+        scope = self._method_scopes.get(name, _missing)
+        if scope is _missing:
+            scope = self._find_scope(name, "callables")
+        if scope is not None:
+            return scope.callables[name]
         else:
             pass
             # raise Exception(f"Method {name} not found")
@@ -52,10 +278,138 @@ class Environment:
     def define_class(self, name: str, _class: Callable):
         self.classes[name] = _class
 
+    def freeze(self) -> FrozenEnvironment:
+        """A frozen snapshot of the names of this environment and the ones enclosing it, lazy variables computed."""
+        chain = []
+        environment: Environment | None = self
+        while environment is not None:
+            environment.evaluate_lazy_variables()
+            chain.append(environment)
+            environment = environment.enclosing
+        values, callables, classes = {}, {}, {}
+        for environment in reversed(chain):
+            values.update(environment.values)
+            callables.update(environment.callables)
+            classes.update(environment.classes)
+        return FrozenEnvironment(values, callables, classes)
+
     def get_class(self, name: str):
         if name in self.classes:
             return self.classes[name]
         elif self.enclosing is not None:
             return self.enclosing.get_class(name)
         else:
-            raise Exception(f"Class {name} not found")
\ No newline at end of file
+            raise Exception(f"Class {name} not found")
+
+
+class FrozenEnvironment(Environment):
+    """
+    An immutable snapshot of an environment, such as the globals: built once per process and shared by every file.
+    Enclosed environments read through it, and an assignment to one of its variables defines the variable
+    in the enclosed environment instead (copy on write), so no file's analysis can change what another file sees.
+    It keeps no lookup caches or dependents, and what is being evaluated is tracked per thread, so it is safe to share
+    between threads; each environment enclosed by it is used by one thread. It is hashable and pickles as its names,
+    to be shipped to worker processes.
+    """
+    frozen = True
+
+    def __init__(self, values: typing.Mapping[str, Any], callables: typing.Mapping[str, Callable] | None = None,
+                 classes: typing.Mapping[str, Callable] | None = None):
+        super().__init__()
+        self.values = MappingProxyType(dict(values))
+        self.lazy_values = MappingProxyType({})
+        self.lazy_definitions = MappingProxyType({})
+        self.callables = MappingProxyType(dict(callables or {}))
+        self.classes = MappingProxyType(dict(classes or {}))
+        # Set last: from here on every attribute is read-only
+        self._hash = hash((frozenset(self.values.items()), frozenset(self.callables), frozenset(self.classes)))
+
+    def __setattr__(self, name: str, value: Any):
+        if "_hash" in self.__dict__:
+            raise TypeError(f"Cannot set {name} of a frozen environment")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name: str):
+        raise TypeError(f"Cannot delete {name} of a frozen environment")
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FrozenEnvironment):
+            return NotImplemented
+        return (self._hash == other._hash and self.values == other.values
+                and self.callables == other.callables and self.classes == other.classes)
+
+    def __reduce__(self):
+        return FrozenEnvironment, (dict(self.values), dict(self.callables), dict(self.classes))
+
+    def _frozen(self, *args):
+        raise TypeError("Cannot change a frozen environment")
+
+    define_variable = define_lazy_variable = define_method = define_class = _frozen
+
+    def assign_variable(self, name: str, value: Any):
+        # An unknown name is reported as Environment reports it, whichever environment the assignment started in
+        if name not in self.values:
+            raise Exception(f"Variable {name} not found")
+        self._frozen()
+
+    def evaluate_lazy_variables(self, names: typing.Iterable[str] | None = None):
+        pass
+
+    def get_variable(self, name: str):
+        # Nothing here ever changes, so lookups are not recorded as dependencies
+        return self.values.get(name)
+
+    def get_method(self, name: str):
+        return self.callables.get(name)
+
+    def get_class(self, name: str):
+        if name in self.classes:
+            return self.classes[name]
+        raise Exception(f"Class {name} not found")
+
+    def call_memoized(self, method: Callable, arguments: list[Any], evaluate: typing.Callable[[], Any]) -> Any:
+        return evaluate()
+
+    def freeze(self) -> FrozenEnvironment:
+        return self
+
+
+class CallCache:
+    """
+    A bounded LRU of the results of the expression-bodied method calls of one environment.
+    Hits and misses are counted per cache, and over all caches in total_hits and total_misses.
+    """
+    total_hits = 0
+    total_misses = 0
+
+    def __init__(self, max_size: int = CALL_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: dict[tuple, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Any | None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            CallCache.total_misses += 1
+            return None
+        # Re-insert so that dict order doubles as least-recently-used order
+        self.entries[key] = entry
+        self.hits += 1
+        CallCache.total_hits += 1
+        return entry
+
+    def put(self, key: tuple, entry: Any):
+        self.entries[key] = entry
+        if len(self.entries) > self.max_size:
+            del self.entries[next(iter(self.entries))]
+
+    @staticmethod
+    def report() -> str:
+        calls = CallCache.total_hits + CallCache.total_misses
+        hit_rate = CallCache.total_hits / calls if calls else 0.0
+        return f"Method calls: {CallCache.total_hits} memoized, {CallCache.total_misses} evaluated ({hit_rate:.0%} hit rate)"
@@ -1,9 +1,25 @@
 import re
+import typing
+import functools
 
 from Environment import Environment
 from Types import Callable, ExpressionBioledMethod
 from tree_sitter import Tree, Node
 
+# An expression compiled by Interpreter.compile: evaluates to a string in the given environment
+CompiledExpression = typing.Callable[[Environment], str]
+
+FUNC_CALL_PATTERN = re.compile(r'^([a-zA-Z_][a-zA-Z0-9_]*)\((.*)\)$')
+IDENTIFIER_PATTERN = re.compile(r'^[a-zA-Z_][a-zA-Z0-9_]*$')
+INTERPOLATION_PATTERN = re.compile(r'\{([^}]+)\}')
+
+# Expression nodes that evaluate to their own source text: literals, and member accesses such as shareGroup.Share.Id
+NODE_EVALUATES_TO_ITS_TEXT = {
+    "string_literal", "verbatim_string_literal", "raw_string_literal", "character_literal",
+    "integer_literal", "real_literal", "null_literal", "member_access_expression",
+}
+
+
 class Interpreter:
     """
     A class that interprets a C# file.
@@ -16,68 +32,179 @@ class Interpreter:
 
     @staticmethod
     def evaluate(node: Node | None, expression: str, environment: Environment) -> str:
+        """
+        Evaluate an expression in the environment.
+        When the expression's tree-sitter node is given it is evaluated from the node and the text is not used.
+        """
+        if node is not None:
+            return Interpreter.evaluate_node(node, environment)
+
         if not expression or not expression.strip():
             return ""
-        
-        expression = expression.strip()
 
-        
-        # Handle function/method call: Foo("bar") or Foo(a, "bar")
-        func_call_match = re.match(r'^([a-zA-Z_][a-zA-Z0-9_]*)\((.*)\)$', expression)
-        if func_call_match:
-            method_name = func_call_match.group(1)
-            args_string = func_call_match.group(2)
-            
-            # Parse and evaluate arguments
-            args = Interpreter._parse_method_arguments(args_string, environment)
-            
-            # Get the method
+        return Interpreter.compile(expression.strip())(environment)
+
+    @staticmethod
+    def evaluate_node(node: Node, environment: Environment) -> str:
+        return Interpreter.compile_node(node)(environment)
+
+    @staticmethod
+    def compile(expression: str) -> CompiledExpression:
+        """
+        Compile an expression into a function of the environment.
+        Compiled expressions are cached by their text, so each distinct expression is only parsed once.
+        """
+        return _compile_cached(expression.strip())
+
+    @staticmethod
+    def compile_node(node: Node) -> CompiledExpression:
+        """
+        Compile an expression node into a function of the environment, by walking the node instead of re-scanning its text.
+        Node types without a dedicated rule fall back to compiling their text.
+        Only strings are kept by the compiled function, never the node itself, so it is cached by the node's type and bytes.
+        """
+        key = (node.type, node.text)
+        compiled = _compiled_nodes.get(key)
+        if compiled is None:
+            if len(_compiled_nodes) >= COMPILED_NODES_MAX_SIZE:
+                _compiled_nodes.clear()
+            compiled = _compiled_nodes[key] = Interpreter._compile_node(node)
+        return compiled
+
+    @staticmethod
+    def _compile_node(node: Node) -> CompiledExpression:
+        if node.type == "interpolated_string_expression":
+            return Interpreter._compile_interpolated_string_node(node)
+        if node.type == "binary_expression" and node.child_by_field_name("operator").type == "+":
+            return Interpreter._compile_binary_concatenation_node(node)
+        if node.type == "invocation_expression":
+            return Interpreter._compile_invocation_node(node)
+        if node.type == "identifier":
+            return Interpreter._compile_variable_reference(node.text.decode())
+        if node.type == "boolean_literal":
+            value = node.text.decode().lower()
+            return lambda environment: value
+        if node.type in NODE_EVALUATES_TO_ITS_TEXT:
+            text = node.text.decode()
+            return lambda environment: text
+        return Interpreter.compile(node.text.decode())
+
+    @staticmethod
+    def _compile_interpolated_string_node(node: Node) -> CompiledExpression:
+        """Compile $"Hello {name}!" from its string_content and interpolation children"""
+        start = node.children[0]
+        if start.type != "interpolation_start" or start.text not in (b'$', b'$@', b'@$'):
+            # Raw interpolated strings ($"""...""") keep the text based rules
+            return Interpreter.compile(node.text.decode())
+
+        pieces: list[str | CompiledExpression] = []
+        # Skip the interpolation start and the opening and closing quotes
+        for child in node.children[2:-1]:
+            if child.type == "interpolation":
+                # { expression [, alignment] [: format] }
+                pieces.append(Interpreter.compile_node(child.children[1]))
+            elif child.type == "string_content":
+                pieces.append(child.text.decode().replace('{{', '{').replace('}}', '}'))
+            else:
+                pieces.append(child.text.decode())
+
+        def string_interpolation(environment: Environment) -> str:
+            return ''.join(
+                piece if isinstance(piece, str) else Interpreter._strip_quotes(piece(environment))
+                for piece in pieces
+            )  # Return without quotes
+        return string_interpolation
+
+    @staticmethod
+    def _compile_binary_concatenation_node(node: Node) -> CompiledExpression:
+        """Compile left + right, where each side is a string, an interpolation or anything that evaluates to one"""
+        left = Interpreter.compile_node(node.child_by_field_name("left"))
+        right = Interpreter.compile_node(node.child_by_field_name("right"))
+
+        def string_concatenation(environment: Environment) -> str:
+            # Remove quotes from string literals and return without quotes
+            return Interpreter._strip_quotes(left(environment)) + Interpreter._strip_quotes(right(environment))
+        return string_concatenation
+
+    @staticmethod
+    def _compile_invocation_node(node: Node) -> CompiledExpression:
+        """Compile Foo(a, "bar"); calls on anything but a plain method name (Get<T>(...), a.B(...)) evaluate to their text"""
+        expression = node.text.decode()
+        function = node.child_by_field_name("function")
+        if function.type != "identifier":
+            return lambda environment: expression
+
+        method_name = function.text.decode()
+        compiled_args = []
+        for argument in node.child_by_field_name("arguments").children:
+            if argument.type == "argument":
+                # The argument value is the last child, after any name: or ref/out/in modifier
+                compiled_args.append(Interpreter.compile_node(argument.children[-1]))
+
+        def method_call(environment: Environment) -> str:
             method = Interpreter._resolve_method_reference(method_name, environment)
-            
             if method:
                 # Call the method with evaluated arguments
+                args = [compiled_arg(environment) for compiled_arg in compiled_args]
                 return Interpreter._call_method(method, args, environment)
-            else:
-                # If method not found, return the original expression
-                return expression
+            # If method not found, return the original expression
+            return expression
+        return method_call
+
+    @staticmethod
+    def _compile(expression: str) -> CompiledExpression:
+        if not expression:
+            return lambda environment: ""
+
+        # Handle function/method call: Foo("bar") or Foo(a, "bar")
+        func_call_match = FUNC_CALL_PATTERN.match(expression)
+        if func_call_match:
+            return Interpreter._compile_method_call(func_call_match.group(1), func_call_match.group(2), expression)
 
         # Handle string concatenation: "abc" + "def" or a + "def"
         if '+' in expression:
-            return Interpreter._resolve_string_concatenation(expression, environment)
-        
+            return Interpreter._compile_string_concatenation(expression)
+
         # Handle string interpolation: $"Hello {name}!"
         if expression.startswith('$"') and expression.endswith('"'):
-            return Interpreter._resolve_string_interpolation(expression, environment)
+            return Interpreter._compile_string_interpolation(expression)
 
         # Handle simple variable reference: a
         if Interpreter._is_simple_identifier(expression):
-            return Interpreter._resolve_variable_reference(expression, environment)
-        
-        # Handle string literals: "Hello"
-        if expression.startswith('"') and expression.endswith('"'):
-            return expression
-        
-        # Handle numeric literals: 123
-        if expression.isdigit():
-            return expression
-        
+            return Interpreter._compile_variable_reference(expression)
+
         # Handle boolean literals
         if expression.lower() in ['true', 'false']:
-            return expression.lower()
-        
-        return expression
+            expression = expression.lower()
+
+        # String literals: "Hello", numeric literals: 123, and anything else evaluate to themselves
+        return lambda environment: expression
 
     @staticmethod
-    def _parse_method_arguments(args_string: str, environment: Environment) -> list:
-        """Parse method arguments string and evaluate each argument"""
+    def _compile_method_call(method_name: str, args_string: str, expression: str) -> CompiledExpression:
+        compiled_args = [Interpreter.compile(arg) for arg in Interpreter._split_method_arguments(args_string)]
+
+        def method_call(environment: Environment) -> str:
+            method = Interpreter._resolve_method_reference(method_name, environment)
+            if method:
+                # Call the method with evaluated arguments
+                args = [compiled_arg(environment) for compiled_arg in compiled_args]
+                return Interpreter._call_method(method, args, environment)
+            # If method not found, return the original expression
+            return expression
+        return method_call
+
+    @staticmethod
+    def _split_method_arguments(args_string: str) -> list[str]:
+        """Split a method arguments string on the commas that are outside of quotes and parentheses"""
         if not args_string.strip():
             return []
-        
+
         args = []
         current_arg = ""
         paren_depth = 0
         quote_char = None
-        
+
         for char in args_string:
             if char == '"' and quote_char != "'":
                 if quote_char == '"':
@@ -99,17 +226,15 @@ class Interpreter:
                 current_arg += char
             elif char == ',' and paren_depth == 0 and not quote_char:
                 # End of argument
-                arg_value = Interpreter.evaluate(None, current_arg.strip(), environment)
-                args.append(arg_value)
+                args.append(current_arg)
                 current_arg = ""
             else:
                 current_arg += char
-        
+
         # Add the last argument
         if current_arg.strip():
-            arg_value = Interpreter.evaluate(None, current_arg.strip(), environment)
-            args.append(arg_value)
-        
+            args.append(current_arg)
+
         return args
 
     @staticmethod
@@ -118,7 +243,7 @@ class Interpreter:
         try:
             # Create a temporary interpreter instance for method calls
             temp_interpreter = Interpreter(environment)
-            
+
             # Call the method
             result = method.call(temp_interpreter, args)
             return result
@@ -126,69 +251,84 @@ class Interpreter:
             return f'"{method.name}({", ".join(args)})"'
 
     @staticmethod
-    def _resolve_string_interpolation(expression: str, environment: Environment) -> str:
-        """Resolve string interpolation like $"Hello {name}!" """
+    def _compile_string_interpolation(expression: str) -> CompiledExpression:
+        """Compile string interpolation like $"Hello {name}!" """
         # Remove the $ and outer quotes
         content = expression[2:-1]
-        
-        # Find all interpolation expressions {variable}
-        pattern = r'\{([^}]+)\}'
-        
-        def replace_interpolation(match):
-            expr = match.group(1).strip()
-            value = Interpreter.evaluate(None, expr, environment)
-            if value.startswith('"') and value.endswith('"'):
-                value = value[1:-1]
-            return value
-        
-        result = re.sub(pattern, replace_interpolation, content)
-        return result  # Return without quotes
-    
-    @staticmethod
-    def _resolve_string_concatenation(expression: str, environment: Environment) -> str:
-        """Resolve string concatenation like "abc" + "def" or a + "def" """
-        parts = expression.split('+')
-        resolved_parts = []
-        
-        for part in parts:
+
+        # Split into literal text and the compiled {expression} holes
+        pieces: list[str | CompiledExpression] = []
+        position = 0
+        for match in INTERPOLATION_PATTERN.finditer(content):
+            pieces.append(content[position:match.start()])
+            pieces.append(Interpreter.compile(match.group(1)))
+            position = match.end()
+        pieces.append(content[position:])
+
+        def string_interpolation(environment: Environment) -> str:
+            return ''.join(
+                piece if isinstance(piece, str) else Interpreter._strip_quotes(piece(environment))
+                for piece in pieces
+            )  # Return without quotes
+        return string_interpolation
+
+    @staticmethod
+    def _compile_string_concatenation(expression: str) -> CompiledExpression:
+        """Compile string concatenation like "abc" + "def" or a + "def" """
+        compiled_parts = []
+        for part in expression.split('+'):
             part = part.strip()
             if not part:
                 continue
             if part.startswith('$"') and part.endswith('"'):
-                part = Interpreter._resolve_string_interpolation(part, environment)
-            # Resolve each part
-            resolved_part = Interpreter.evaluate(None, part, environment)
-            # Remove quotes if it's a string literal
-            if resolved_part.startswith('"') and resolved_part.endswith('"'):
-                resolved_part = resolved_part[1:-1]
-            resolved_parts.append(resolved_part)
-        
-        # Join all parts and return without quotes
-        result = ''.join(resolved_parts)
-        return result
-
-    @staticmethod
-    def _resolve_variable_reference(var_name: str, environment: Environment) -> str:
-        """Resolve a variable reference to its value"""
-        try:
+                # The interpolated text is itself evaluated once more, as an expression
+                interpolation = Interpreter._compile_string_interpolation(part)
+                compiled_parts.append(
+                    lambda environment, interpolation=interpolation: Interpreter.evaluate(None, interpolation(environment), environment)
+                )
+            else:
+                compiled_parts.append(Interpreter.compile(part))
+
+        def string_concatenation(environment: Environment) -> str:
+            # Join all parts, removing quotes from string literals, and return without quotes
+            return ''.join(Interpreter._strip_quotes(part(environment)) for part in compiled_parts)
+        return string_concatenation
+
+    @staticmethod
+    def _compile_variable_reference(var_name: str) -> CompiledExpression:
+        """Compile a variable reference, which resolves to its value or to its name if it is not defined"""
+        def variable_reference(environment: Environment) -> str:
             value = environment.get_variable(var_name)
             if value is not None:
                 return str(value)
             return var_name  # Return variable name without quotes if not found
-        except:
-            return var_name  # Return variable name without quotes if error
-        
-    
+        return variable_reference
+
+    @staticmethod
+    def _strip_quotes(value: str) -> str:
+        if value.startswith('"') and value.endswith('"'):
+            return value[1:-1]
+        return value
+
     @staticmethod
     def _resolve_method_reference(method_name: str, environment: Environment) -> Callable:
         """Resolve a method reference to its value"""
         return environment.get_method(method_name)
-    
+
     @staticmethod
     def _is_simple_identifier(expression: str) -> bool:
         """Check if expression is a simple identifier (variable name)"""
         # Simple check: no spaces, no special characters except underscore
-        return bool(re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', expression))
+        return bool(IDENTIFIER_PATTERN.match(expression))
 
     def interpret(self, tree: Tree):
         pass
+
+
+COMPILED_NODES_MAX_SIZE = 4096
+_compiled_nodes: dict[tuple[str, bytes | None], CompiledExpression] = {}
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_cached(expression: str) -> CompiledExpression:
+    return Interpreter._compile(expression)
@@ -2,6 +2,9 @@ from __future__ import annotations
 from typing import Any
 
 class Variable:
+    # Slotted, like the classes below: a large suite keeps one object per method
+    __slots__ = ("name", "_type")
+
     def __init__(self, name: str, _type: str):
         # name is the name of the variable
         # _type could be a string, int, float, bool, or any other type
@@ -9,6 +12,8 @@ class Variable:
         self._type = _type
 
 class Callable(Variable):
+    __slots__ = ("arity",)
+
     def __init__(self, name: str, _type: str, arity: int):
         # arity is the number of arguments the method takes
         # _type could be method
@@ -24,19 +29,33 @@ class Callable(Variable):
 
 
 class ExpressionBioledMethod(Callable):
-    def __init__(self, name: str, _type: str, arity: int, expression_body: str, parameter_names: list[str]):
+    __slots__ = ("expression_body", "parameter_names", "compiled_body", "environment")
+
+    def __init__(self, name: str, _type: str, arity: int, expression_body: str, parameter_names: list[str], compiled_body: Any = None,
+                 environment: Any = None):
         super().__init__(name, _type, arity)
         self.expression_body = expression_body
         self.parameter_names = parameter_names
+        self.compiled_body = compiled_body  # compiled from expression_body on the first call if not given
+        # The environment the method is defined in. When known, calls are evaluated in it, like C# scoping,
+        # and memoized there; otherwise they are evaluated in the caller's environment.
+        self.environment = environment
 
     def call(self, interpreter: Any, arguments: list[Any]):
         from Interpreter import Interpreter
-        from Environment import Environment
         assert(isinstance(interpreter, Interpreter))
 
+        if self.environment is not None:
+            return self.environment.call_memoized(self, arguments, lambda: self._evaluate(self.environment, arguments))
+        return self._evaluate(interpreter.environment, arguments)
+
+    def _evaluate(self, enclosing: Any, arguments: list[Any]):
+        from Interpreter import Interpreter
+        from Environment import Environment
+
         # Create a temporary environment for this method call
         # This allows us to bind the arguments to parameter names
-        temp_environment = Environment(interpreter.environment)
+        temp_environment = Environment(enclosing)
         
         # Bind arguments to parameter names
         for i, param_name in enumerate(self.parameter_names):
@@ -44,7 +63,9 @@ class ExpressionBioledMethod(Callable):
                 temp_environment.define_variable(param_name, arguments[i])
         
         # Evaluate the expression body in the temporary environment
-        result = Interpreter.evaluate(None, self.expression_body, temp_environment)
+        if self.compiled_body is None:
+            self.compiled_body = Interpreter.compile(self.expression_body)
+        result = self.compiled_body(temp_environment)
         
         return result
 
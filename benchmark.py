@@ -0,0 +1,593 @@
+import io
+import os
+import re
+import sys
+import json
+import mmap
+import random
+import time
+import pstats
+import cProfile
+import argparse
+import platform
+import shutil
+import weakref
+import tempfile
+import contextlib
+import tracemalloc
+
+import tree_sitter_c_sharp as tscs
+from tree_sitter import Language, Parser
+
+from cs import CSFile, CSMethod, PARSER_POOL
+from corpus import CorpusConfig, CorpusGenerator
+from Interpreter import Interpreter
+from extension import SwaggerAdder
+from Environment import Environment
+from helper import create_globals, globals, paths, PathResolver
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+csfiles_dir = os.path.join(current_dir, "csfiles")
+
+
+def read_corpus(directory: str = csfiles_dir) -> list[str]:
+    """Read every .cs file in the directory, in a stable order."""
+    sources = []
+    for entry in sorted(os.listdir(directory)):
+        if entry.endswith(".cs"):
+            with open(os.path.join(directory, entry), 'r', encoding='utf-8') as f:
+                sources.append(f.read())
+    return sources
+
+
+def timed(func, repeat: int) -> float:
+    """Run func repeat times and return the best wall time of a single run, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parser_pool(repeat: int = 20):
+    """
+    Per-file parser setup cost on the csfiles/ corpus.
+    "fresh" builds a Language and Parser for every file, which is what CSFile used to do,
+    "pooled" borrows a parser from PARSER_POOL.
+    """
+    sources = [source.encode() for source in read_corpus()]
+    setups = 1000
+
+    def fresh_setup():
+        for _ in range(setups):
+            Parser(Language(tscs.language()))
+
+    def pooled_setup():
+        for _ in range(setups):
+            PARSER_POOL.release(PARSER_POOL.acquire())
+
+    parser = Parser(Language(tscs.language()))
+    parse_only = lambda: [parser.parse(source) for source in sources]
+    parse_only()
+
+    fresh_time = timed(fresh_setup, repeat) / setups
+    pooled_time = timed(pooled_setup, repeat) / setups
+    parse_time = timed(parse_only, repeat) / len(sources)
+
+    env = Environment(create_globals(globals))
+    text_sources = read_corpus()
+    csfile_time = timed(lambda: [CSFile(source, env) for source in text_sources], repeat) / len(sources)
+
+    print(f"parser pool ({len(sources)} files, best of {repeat})")
+    print(f"  setup, fresh parser   {fresh_time * 1e6:9.2f} us/file")
+    print(f"  setup, pooled parser  {pooled_time * 1e6:9.2f} us/file")
+    print(f"  parse                 {parse_time * 1e6:9.2f} us/file")
+    print(f"  CSFile end to end     {csfile_time * 1e6:9.2f} us/file")
+
+
+def replicate_corpus(target_dir: str, copies: int, directory: str = csfiles_dir):
+    """Fill target_dir with copies of the csfiles/ corpus, one sub folder per copy."""
+    for i in range(copies):
+        shutil.copytree(directory, os.path.join(target_dir, f"copy_{i:04d}"))
+
+
+def bench_jobs(copies: int = 50, job_counts: tuple[int, ...] = (1, 2, 4)):
+    """Wall time of SwaggerAdder.process_all for different --jobs values on a replicated corpus."""
+    print(f"process_all --jobs ({copies} copies of csfiles/, {os.cpu_count()} cpus)")
+    baseline = None
+    for jobs in job_counts:
+        # process_all rewrites files in place, so every run gets a fresh corpus
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            replicate_corpus(corpus_dir, copies)
+            swagger_adder = SwaggerAdder(corpus_dir)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                swagger_adder.process_all(jobs=jobs)
+                elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"  jobs={jobs:<3} {elapsed:8.2f} s  speedup {baseline / elapsed:5.2f}x")
+
+
+def generate_test_class(methods: int, class_name: str = "Generated") -> str:
+    """Generate an APITest class with the given number of test methods, two Sends each."""
+    lines = [
+        f"public sealed class {class_name} : APITest",
+        "{",
+        '    private string Endpoint => $"{GlobalLabShare}/gl-share/api/Admin/share";',
+        '    private string EndpointWithShareLink(string shareLink) => $"{Endpoint}/{shareLink}";',
+    ]
+    for i in range(methods):
+        lines += [
+            "    [Test]",
+            "    [Data.SetUp(Tokens.TokenAdminAPI)]",
+            f"    public void GET_AdminShare_Generated_200_{i}()",
+            "    {",
+            "        var token = Get<Token>(Tokens.TokenAdminAPI);",
+            "        Send(",
+            "            Get($\"{EndpointWithShareLink(token.Id)}\") with",
+            "            { Authorization = Bearer(token.AccessToken) }",
+            "        );",
+            "        Verify(Response.StatusCode).Is(OK);",
+            "        Verify(token.Id).Is(token.Id);",
+            "        Send(",
+            "            Patch(new { }.As(SerializationFormat.Json))",
+            "            .To($\"{EndpointWithShareLink(token.Id)}/disability\") with",
+            "            { Authorization = Bearer(token.AccessToken) }",
+            "        );",
+            "        Verify(Response.StatusCode).Is(NoContent);",
+            "    }",
+        ]
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def analyze_sends(source: str, env: Environment) -> int:
+    """Build a CSFile and find the Sends of every test method, with the Verify statements after each counted."""
+    sends = 0
+    for csharp_class in CSFile(source, env).get_classes():
+        for method in csharp_class.get_test_methods():
+            sends += len(method.send_functions)
+    return sends
+
+
+def bench_many_methods(method_counts: tuple[int, ...] = (125, 250, 500, 1000), repeat: int = 3):
+    """Time to parse one generated class and scan the Sends and Verify calls of its test methods, as their number grows."""
+    env = Environment(create_globals(globals))
+    print(f"CSFile and send_functions on one generated class (best of {repeat})")
+    for methods in method_counts:
+        source = generate_test_class(methods)
+        assert(analyze_sends(source, env) == 2 * methods)
+        elapsed = timed(lambda: analyze_sends(source, env), repeat)
+        print(f"  {methods:5d} methods {elapsed * 1e3:9.1f} ms  {elapsed * 1e6 / methods:8.1f} us/method")
+
+
+def bench_expressions(rounds: int = 2000, repeat: int = 5):
+    """Throughput of Interpreter.evaluate and of calling Endpoint-style helpers on the testfile.cs class."""
+    with open(os.path.join(current_dir, "testfile.cs"), 'r', encoding='utf-8') as f:
+        cs_file = CSFile(f.read(), Environment(create_globals(globals)))
+    class_env = next(cs_file.get_classes()).environment
+    expressions = [
+        'Endpoint',
+        '$"{EndpointWithShareLink(shareGroup.Share.Id)}"',
+        '$"{EndpointWithShareLink(shareGroup.Share.Id)}/disability"',
+        '$"{GlobalLabShare}/gl-share/api/Admin/share" + APIVersion',
+        'EndpointWithParameters(DefaultPageNumber, DefaultPageSize)',
+        '"literal"',
+    ]
+    helper = class_env.get_method("EndpointWithShareLink")
+    interpreter = Interpreter(class_env)
+
+    def evaluate_all():
+        for _ in range(rounds):
+            for expression in expressions:
+                Interpreter.evaluate(None, expression, class_env)
+
+    def call_helper():
+        for _ in range(rounds):
+            helper.call(interpreter, ["1234"])
+
+    evaluate_time = timed(evaluate_all, repeat)
+    call_time = timed(call_helper, repeat)
+    print(f"expressions (best of {repeat})")
+    print(f"  Interpreter.evaluate         {rounds * len(expressions) / evaluate_time:10.0f} expressions/s")
+    print(f"  EndpointWithShareLink(...)   {rounds / call_time:10.0f} calls/s")
+
+
+def walk_get_variable(environment: Environment, name: str):
+    """The recursive lookup Environment.get_variable did before scopes were cached, kept for comparison."""
+    while environment is not None:
+        if name in environment.values:
+            return environment.values[name]
+        environment = environment.enclosing
+    return None
+
+
+def bench_scopes(rounds: int = 2000, repeat: int = 5):
+    """Identifier resolution from a method environment of testfile.cs, five scopes below the globals."""
+    with open(os.path.join(current_dir, "testfile.cs"), 'r', encoding='utf-8') as f:
+        cs_file = CSFile(f.read(), Environment(create_globals(globals)))
+    test_method = next(next(cs_file.get_classes()).get_test_methods())
+    method_env = test_method.method_environment
+    names = ["GlobalLabShare", "ShareAPI", "RecipientsAPI", "HealthAPI", "AuditLogAPI", "GeoLocation", "APIVersion", "token"]
+    expression = '$"' + "/".join("{" + name + "}" for name in names) + '"'
+    compiled = Interpreter.compile(expression)
+    assert([walk_get_variable(method_env, name) for name in names] == [method_env.get_variable(name) for name in names])
+
+    walk_time = timed(lambda: [walk_get_variable(method_env, name) for _ in range(rounds) for name in names], repeat)
+    cached_time = timed(lambda: [method_env.get_variable(name) for _ in range(rounds) for name in names], repeat)
+    interpolation_time = timed(lambda: [compiled(method_env) for _ in range(rounds)], repeat)
+    lookups = rounds * len(names)
+    print(f"scope lookups from a method environment (best of {repeat})")
+    print(f"  walk to the defining scope     {walk_time * 1e9 / lookups:8.1f} ns/lookup")
+    print(f"  Environment.get_variable       {cached_time * 1e9 / lookups:8.1f} ns/lookup")
+    print(f"  {len(names)}-identifier interpolation  {interpolation_time * 1e6 / rounds:8.2f} us/evaluation")
+
+
+def is_regex_function(filename: str, name: str) -> bool:
+    """Whether a cProfile entry is a function of the re module: compiling, the pattern cache or matching."""
+    if filename == "~":
+        return "re.Pattern" in name or "_sre" in name
+    return os.path.dirname(filename) == os.path.dirname(re.__file__)
+
+
+def bench_regex(repeat: int = 5):
+    """Time spent in the re module per Send while extracting the Sends of the csfiles/ corpus, profiled with cProfile."""
+    sources = read_corpus()
+    env = Environment(create_globals(globals))
+
+    def extract_sends() -> int:
+        sends = 0
+        for source in sources:
+            for csharp_class in CSFile(source, env).get_classes():
+                for method in csharp_class.get_test_methods():
+                    sends += len(method.send_functions)
+        return sends
+
+    extract_sends()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    sends = sum(extract_sends() for _ in range(repeat))
+    profiler.disable()
+
+    regex_calls = 0
+    regex_time = total_time = 0.0
+    for (filename, _, name), (_, calls, own_time, _, _) in pstats.Stats(profiler).stats.items():
+        total_time += own_time
+        if is_regex_function(filename, name):
+            regex_calls += calls
+            regex_time += own_time
+    print(f"regex time extracting Sends ({sends // repeat} Sends in csfiles/, {repeat} runs under cProfile)")
+    print(f"  re calls        {regex_calls / sends:8.1f} per Send")
+    print(f"  time in re      {regex_time * 1e6 / sends:8.1f} us/Send  ({regex_time / total_time:.0%} of the profiled time)")
+    print(f"  profiled total  {total_time * 1e6 / sends:8.1f} us/Send")
+
+
+def swagger_paths(path: str = os.path.join(current_dir, "swagger.json")) -> list[str]:
+    with open(path, 'r') as f:
+        return list(json.load(f)["paths"])
+
+
+def paths_declarations(routes: list[str]) -> str:
+    """Declare routes the way helper.paths does, as Paths constants."""
+    return "\n".join(f'public const string Route{i} = "{route}";' for i, route in enumerate(routes))
+
+
+def scan_var_for_path(resolver: PathResolver, path: str):
+    """The linear scan PathResolver.get_var_for_path used before the trie, kept for comparison."""
+    path_lc = path.lower()
+    if path_lc.startswith('http://') or path_lc.startswith('https://'):
+        idx = path_lc.find('/api')
+        if idx != -1:
+            path_lc = path_lc[idx:]
+    idx = path_lc.find('?')
+    if idx != -1:
+        path_lc = path_lc[:idx]
+    if path_lc in resolver.paths['plain']:
+        return resolver.paths['plain'][path_lc]
+    for template, var_name in resolver.paths['formatted'].items():
+        regex = re.sub(r'\{[^}]+\}', r'[^/]+', re.escape(template).replace(r'\{', '{').replace(r'\}', '}'))
+        regex = '^' + regex + '$'
+        if re.match(regex, path_lc):
+            return var_name
+    return None
+
+
+def bench_path_resolver(versions: tuple[int, ...] = (1, 5, 20), lookups: int = 2000, repeat: int = 3):
+    """PathResolver lookups of evaluated Send paths, against the old linear scan, as the route surface grows."""
+    routes = swagger_paths()
+    print(f"PathResolver.get_var_for_path (best of {repeat})")
+    for version_count in versions:
+        # Grow the surface by repeating the swagger routes under /api/v<n>/
+        surface = [route.replace("/api/", f"/api/v{v}/") if v else route for v in range(version_count) for route in routes]
+        resolver = PathResolver(paths_declarations(surface))
+        rng = random.Random(0)
+        queries = [
+            "https://qa-share.transperfect.com/gl-share" + re.sub(r'\{[^}]+\}', lambda m: rng.choice(["shareGroup.Share.Id", "1234"]), rng.choice(surface)) + "?api-version=1"
+            for _ in range(lookups)
+        ]
+        distinct = len(set(queries))
+        scan_time = timed(lambda: [scan_var_for_path(resolver, query) for query in queries], repeat)
+        trie_time = timed(lambda: [resolver._get_var_for_path(query) for query in queries], repeat)
+        cached_time = timed(lambda: [resolver.get_var_for_path(query) for query in queries], repeat)
+        templated = len(resolver.paths['formatted'])
+        print(f"  {templated:5d} templated routes  scan {scan_time * 1e6 / lookups:8.1f} us  trie {trie_time * 1e6 / lookups:6.1f} us  trie+LRU {cached_time * 1e6 / lookups:6.1f} us  ({distinct} distinct paths)")
+
+
+def bench_rewrite(method_counts: tuple[int, ...] = (125, 250, 500, 1000), repeat: int = 3):
+    """Time to write the Swagger attributes into one generated class, as the number of annotated methods grows."""
+    print(f"SwaggerAdder.insert_swagger_attribute (best of {repeat})")
+    with tempfile.TemporaryDirectory() as work_dir:
+        file_path = os.path.join(work_dir, "Generated.cs")
+        swagger_adder = SwaggerAdder(file_path)
+        for methods in method_counts:
+            source = generate_test_class(methods)
+            with contextlib.redirect_stdout(io.StringIO()):
+                line_changes, _ = swagger_adder.analyze_source(source, file_path)
+            elapsed = timed(lambda: swagger_adder.insert_swagger_attribute(file_path, source, line_changes), repeat)
+            print(f"  {len(line_changes):5d} attributes {elapsed * 1e3:8.2f} ms  {elapsed * 1e6 / len(line_changes):6.2f} us/attribute")
+
+
+def bench_incremental(method_counts: tuple[int, ...] = (250, 1000, 4000), repeat: int = 5):
+    """
+    Latency from saving an edit to one test method to updated Swagger suggestions, in watch mode:
+    a full parse and analysis against CSFile.reparse of the previous tree.
+    """
+    print(f"watch mode: edit one method and decide again (best of {repeat})")
+    swagger_adder = SwaggerAdder("Generated.cs")
+    for methods in method_counts:
+        source = CorpusGenerator(CorpusConfig(files=1, methods_per_class=methods)).generate_source()
+        # Toggle one Verify in the middle method so that every reparse sees an edit
+        middle = source.find("IsNot(null)", len(source) // 2)
+        versions = [source, source[:middle] + "IsNot(string.Empty)" + source[middle + len("IsNot(null)"):]]
+        summaries = weakref.WeakKeyDictionary()
+        with contextlib.redirect_stdout(io.StringIO()):
+            cs_file = CSFile(source, swagger_adder.globals)
+            swagger_adder.decide(cs_file, "Generated.cs", summaries)
+
+            def full():
+                swagger_adder.analyze_source(versions[1], "Generated.cs")
+
+            def incremental():
+                versions.reverse()
+                cs_file.reparse(versions[0])
+                swagger_adder.decide(cs_file, "Generated.cs", summaries)
+
+            full_time = timed(full, repeat)
+            incremental_time = timed(incremental, repeat)
+        print(f"  {methods:5d} methods ({len(source) // 1024:5d} KiB)  full {full_time * 1e3:8.2f} ms  incremental {incremental_time * 1e3:7.2f} ms")
+
+
+def bench_input(methods: int = 3000):
+    """
+    Peak traced memory and time of SwaggerAdder.analyze_source on one large generated file,
+    read as text, as bytes and as a memory map, against the size of the parse tree alone.
+    """
+    source = generate_test_class(methods)
+    swagger_adder = SwaggerAdder("Generated.cs")
+    with tempfile.TemporaryDirectory() as work_dir:
+        file_path = os.path.join(work_dir, "Generated.cs")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        print(f"analyze_source input ({os.path.getsize(file_path) / 2**20:.1f} MiB file, {methods} methods)")
+
+        def read_text():
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
+
+        def read_bytes():
+            with open(file_path, 'rb') as f:
+                return f.read()
+
+        def read_mmap():
+            with open(file_path, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        def parse_only():
+            with PARSER_POOL.borrow() as parser:
+                return parser.parse(read_bytes())
+
+        for name, analyze in [
+            ("parse tree", parse_only),
+            ("text", lambda: swagger_adder.analyze_source(read_text(), file_path)),
+            ("bytes", lambda: swagger_adder.analyze_source(read_bytes(), file_path)),
+            ("mmap", lambda: swagger_adder.analyze_source(read_mmap(), file_path)),
+        ]:
+            with contextlib.redirect_stdout(io.StringIO()):
+                tracemalloc.start()
+                start = time.perf_counter()
+                analyze()
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            print(f"  {name:<10} peak {peak / 2**20:7.1f} MiB  {elapsed * 1e3:8.1f} ms")
+
+
+def object_size(obj: object, seen: set[int]) -> int:
+    """The size of an object with its instance dict, and the strings and lists of strings it holds that were not already counted."""
+    size = sys.getsizeof(obj)
+    fields = getattr(obj, "__dict__", None)
+    if fields is not None:
+        size += sys.getsizeof(fields)
+    else:
+        fields = {name: getattr(obj, name) for owner in type(obj).__mro__
+                  for name in getattr(owner, "__slots__", ()) if name != "__weakref__" and hasattr(obj, name)}
+    for value in fields.values():
+        values = value if isinstance(value, list) else [value]
+        if values is value:
+            size += sys.getsizeof(value)
+        for item in values:
+            if isinstance(item, str) and id(item) not in seen:
+                seen.add(id(item))
+                size += sys.getsizeof(item)
+    return size
+
+
+def bench_model(files: int = 100, methods_per_file: int = 100):
+    """
+    Memory of the data model kept for a parsed suite: the CSMethod, Send and ExpressionBioledMethod objects,
+    with their instance dicts and the strings they own, scaled to 10,000 test methods. Parse trees are not counted.
+    """
+    config = CorpusConfig(files=files, methods_per_class=methods_per_file)
+    generator = CorpusGenerator(config)
+    env = Environment(create_globals(globals))
+    counts: dict[str, int] = {}
+    sizes: dict[str, int] = {}
+    test_methods = 0
+    seen: set[int] = set()
+    for file_index in range(files):
+        with contextlib.redirect_stdout(io.StringIO()):
+            cs_file = CSFile(generator.generate_source(file_index), env)
+            objects: list[object] = []
+            for csharp_class in cs_file.get_classes():
+                objects += [method for method in csharp_class.environment.callables.values()]
+                for method in csharp_class.get_test_methods():
+                    test_methods += 1
+                    objects += method.send_functions
+        for obj in objects:
+            name = type(obj).__name__
+            counts[name] = counts.get(name, 0) + 1
+            sizes[name] = sizes.get(name, 0) + object_size(obj, seen)
+        seen.clear()
+
+    scale = 10_000 / test_methods
+    print(f"Data model per 10,000 test methods ({test_methods} parsed in {files} files)")
+    for name in sorted(sizes):
+        print(f"  {name:<22} {counts[name] * scale:8.0f} objects {sizes[name] * scale / 2**20:7.2f} MiB"
+              f"  {sizes[name] / counts[name]:6.0f} B/object")
+    print(f"  {'total':<22} {sum(counts.values()) * scale:8.0f} objects {sum(sizes.values()) * scale / 2**20:7.2f} MiB")
+
+
+@contextlib.contextmanager
+def accumulate_time(owner: type, method_name: str, totals: dict, key: str):
+    """Add the time spent in owner.method_name to totals[key] while the block runs."""
+    original = getattr(owner, method_name)
+
+    def timed_method(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            totals[key] += time.perf_counter() - start
+
+    setattr(owner, method_name, timed_method)
+    try:
+        yield
+    finally:
+        setattr(owner, method_name, original)
+
+
+def run_suite(config: CorpusConfig) -> dict:
+    """
+    Generate a synthetic corpus and time each phase of the pipeline over all of it, in seconds:
+    parse (tree-sitter only), environment (CSFile, classes and methods, without parsing and Send extraction),
+    sends (Send extraction and Verify counting), paths (PathResolver lookups) and rewrite (writing the attributes).
+    """
+    phases = {"parse": 0.0, "environment": 0.0, "sends": 0.0, "paths": 0.0, "rewrite": 0.0}
+    counts = {"files": 0, "classes": 0, "methods": 0, "sends": 0, "attributes": 0}
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        file_paths = CorpusGenerator(config).write(corpus_dir)
+        swagger_adder = SwaggerAdder(corpus_dir)
+        resolver = PathResolver(paths)
+        env = swagger_adder.globals
+
+        for file_path in file_paths:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                source = f.read()
+            counts["files"] += 1
+
+            with PARSER_POOL.borrow() as parser:
+                start = time.perf_counter()
+                parser.parse(source.encode())
+                parse_time = time.perf_counter() - start
+            phases["parse"] += parse_time
+
+            send_time = {"sends": 0.0}
+            with accumulate_time(CSMethod, "_parse_send_functions", send_time, "sends"):
+                start = time.perf_counter()
+                cs_file = CSFile(source, env)
+                methods = [
+                    (method, method.send_functions)
+                    for csharp_class in cs_file.get_classes()
+                    for method in csharp_class.get_test_methods()
+                ]
+                build_time = time.perf_counter() - start
+            phases["sends"] += send_time["sends"]
+            phases["environment"] += build_time - send_time["sends"] - parse_time
+            counts["classes"] += sum(1 for _ in cs_file.get_classes())
+            counts["methods"] += len(methods)
+            counts["sends"] += sum(len(sends) for _, sends in methods)
+
+            start = time.perf_counter()
+            for method, _ in methods:
+                send = swagger_adder.select_best_send(method, method.name)
+                if send is not None:
+                    resolver.get_var_for_path(str(send.evaluated_path))
+            phases["paths"] += time.perf_counter() - start
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                line_changes, _ = swagger_adder.analyze_source(source, file_path)
+            counts["attributes"] += len(line_changes)
+            start = time.perf_counter()
+            swagger_adder.insert_swagger_attribute(file_path, source, line_changes)
+            phases["rewrite"] += time.perf_counter() - start
+
+    return {
+        "config": config.as_dict(),
+        "counts": counts,
+        "seconds": phases,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def bench_suite(config: CorpusConfig | None = None, json_path: str | None = None):
+    """Phase by phase timings on a synthetic corpus, optionally written to json_path to compare versions."""
+    config = config or CorpusConfig()
+    results = run_suite(config)
+    counts = results["counts"]
+    print(f"suite ({counts['files']} files, {counts['classes']} classes, {counts['methods']} methods, {counts['sends']} sends)")
+    for phase, seconds in results["seconds"].items():
+        print(f"  {phase:<12} {seconds * 1e3:9.1f} ms  {seconds * 1e6 / max(counts['methods'], 1):8.1f} us/method")
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"  results written to {json_path}")
+
+
+BENCHMARKS = {
+    "pool": bench_parser_pool,
+    "jobs": bench_jobs,
+    "methods": bench_many_methods,
+    "expressions": bench_expressions,
+    "scopes": bench_scopes,
+    "regex": bench_regex,
+    "paths": bench_path_resolver,
+    "rewrite": bench_rewrite,
+    "incremental": bench_incremental,
+    "input": bench_input,
+    "model": bench_model,
+    "suite": bench_suite,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the C# analysis pipeline.")
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run, all of them by default: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--files", type=int, default=100, help="suite: number of generated files")
+    parser.add_argument("--classes", type=int, default=1, help="suite: classes per file")
+    parser.add_argument("--methods", type=int, default=10, help="suite: test methods per class")
+    parser.add_argument("--sends", type=int, default=2, help="suite: Sends per test method")
+    parser.add_argument("--depth", type=int, default=2, help="suite: nested helper calls in each Send path")
+    parser.add_argument("--seed", type=int, default=0, help="suite: random seed of the generated corpus")
+    parser.add_argument("--json", help="suite: write the results to this JSON file")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}")
+
+    for name in args.names or list(BENCHMARKS):
+        if name == "suite":
+            config = CorpusConfig(args.files, args.classes, args.methods, args.sends, args.depth, args.seed)
+            bench_suite(config, args.json)
+        else:
+            BENCHMARKS[name]()
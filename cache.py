@@ -0,0 +1,68 @@
+import os
+import json
+import hashlib
+from typing import Any
+
+from helper import globals, paths
+
+# Bump this when the analysis changes in a way that makes old cached decisions wrong.
+CACHE_VERSION = "3"
+
+# Cached decisions are only valid for the globals and paths they were computed with.
+CONFIG_HASH = hashlib.sha256(f"{CACHE_VERSION}\0{globals}\0{paths}".encode()).hexdigest()
+
+
+def content_key(source: str | bytes) -> str:
+    """Return the cache key of a file: a hash of its content, as text or UTF-8 bytes, and of the configuration."""
+    key = hashlib.sha256(f"{CONFIG_HASH}\0".encode())
+    key.update(source.encode() if isinstance(source, str) else source)
+    return key.hexdigest()
+
+
+class SwaggerCache:
+    """
+    An on-disk cache of the Swagger attributes computed for each file, stored as the rows of its FileSummary.
+    Entries are keyed by content_key(), so an unchanged file is never re-parsed.
+    Holds at most max_entries entries, evicting the least recently used one first.
+    """
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries: dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # A corrupt cache is just an empty cache
+            return
+        if data.get("config") == CONFIG_HASH:
+            self.entries = data.get("entries", {})
+
+    def get(self, key: str) -> Any | None:
+        decisions = self.entries.pop(key, None)
+        if decisions is None:
+            self.misses += 1
+            return None
+        # Re-insert so that dict order doubles as least-recently-used order
+        self.entries[key] = decisions
+        self.hits += 1
+        return decisions
+
+    def put(self, key: str, decisions: Any):
+        self.entries.pop(key, None)
+        self.entries[key] = decisions
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"config": CONFIG_HASH, "entries": self.entries}, f)
+        os.replace(temp_path, self.path)
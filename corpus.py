@@ -0,0 +1,124 @@
+import os
+import re
+import json
+import random
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+swagger_path = os.path.join(current_dir, "swagger.json")
+
+# Verify(Response.StatusCode).Is(...) names for the codes the generated tests expect
+STATUS_NAMES = {
+    "200": "OK", "201": "Created", "204": "NoContent", "400": "BadRequest",
+    "401": "Unauthorized", "403": "Forbidden", "404": "NotFound",
+}
+
+
+class CorpusConfig:
+    """
+    The scale of a synthetic API test corpus.
+    expression_depth is how many nested helper calls the path of each Send goes through.
+    """
+    def __init__(self, files: int = 100, classes_per_file: int = 1, methods_per_class: int = 10,
+                 sends_per_method: int = 2, expression_depth: int = 2, seed: int = 0):
+        self.files = files
+        self.classes_per_file = classes_per_file
+        self.methods_per_class = methods_per_class
+        self.sends_per_method = sends_per_method
+        self.expression_depth = expression_depth
+        self.seed = seed
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def load_operations(path: str = swagger_path) -> list[tuple[str, str, list[str]]]:
+    """(route, HTTP method, response codes) for every operation in swagger.json."""
+    with open(path, 'r') as f:
+        swagger = json.load(f)
+    operations = []
+    for route, methods in swagger["paths"].items():
+        for method, operation in methods.items():
+            codes = [code for code in operation.get("responses", {}) if code in STATUS_NAMES] or ["200"]
+            operations.append((route, method.capitalize(), codes))
+    return operations
+
+
+class CorpusGenerator:
+    """
+    Generate APITest classes that look like the real test files: expression-bodied Endpoint helpers,
+    test methods with Data attributes, Sends in both Get(path) and Post(body).To(path) styles,
+    and Verify statements after each Send.
+    """
+    def __init__(self, config: CorpusConfig, operations: list[tuple[str, str, list[str]]] | None = None):
+        self.config = config
+        self.operations = operations or load_operations()
+        self.random = random.Random(config.seed)
+        self.test_id = 100000
+
+    def generate_source(self, file_index: int = 0) -> str:
+        lines = ["using TransPerfect.Automation.Framework;", f"namespace Tests.API.Generated{file_index};", ""]
+        for class_index in range(self.config.classes_per_file):
+            lines += self._generate_class(f"Generated_{file_index}_{class_index}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, target_dir: str) -> list[str]:
+        """Write the corpus into target_dir and return the file paths, in path order."""
+        os.makedirs(target_dir, exist_ok=True)
+        file_paths = []
+        for file_index in range(self.config.files):
+            file_path = os.path.join(target_dir, f"Generated_{file_index:05d}.cs")
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(self.generate_source(file_index))
+            file_paths.append(file_path)
+        return file_paths
+
+    def _generate_class(self, class_name: str) -> list[str]:
+        lines = [
+            "[Parallelizable(ParallelScope.All)]",
+            f"public sealed class {class_name} : APITest",
+            "{",
+            "    public static int DefaultPageNumber = 1;",
+            '    private string Route0(string path) => $"{GlobalLabShare}/gl-share{path}";',
+        ]
+        for depth in range(1, self.config.expression_depth):
+            lines.append(f"    private string Route{depth}(string path) => Route{depth - 1}(path);")
+        for _ in range(self.config.methods_per_class):
+            lines += [""] + self._generate_method()
+        lines += ["}", ""]
+        return lines
+
+    def _generate_method(self) -> list[str]:
+        sends = [self.random.choice(self.operations) for _ in range(self.config.sends_per_method)]
+        route, verb, codes = sends[0]
+        code = self.random.choice(codes)
+        self.test_id += 1
+        lines = [
+            "    [Test]",
+            "    [Data.SetUp(Tokens.TokenAdminAPI, Shares.KkomradeNoMessage)]",
+            "    [Recycle(Recycled.TokenAdminAPI)]",
+            f"    public void {verb.upper()}_Generated_Case_{code}_{self.test_id}()",
+            "    {",
+            "        var token = Get<Token>(Tokens.TokenAdminAPI);",
+            "        var shareGroup = Get<ShareGroup>(Shares.KkomradeNoMessage);",
+        ]
+        for index, (route, verb, codes) in enumerate(sends):
+            lines += [""] + self._generate_send(route, verb)
+            send_code = code if index == 0 else self.random.choice(codes)
+            lines.append(f"        Verify(Response.StatusCode).Is({STATUS_NAMES[send_code]});")
+            lines.append("        Verify(Response.Content).IsNot(null);")
+        lines.append("    }")
+        return lines
+
+    def _generate_send(self, route: str, verb: str) -> list[str]:
+        path = re.sub(r'\{[^}]+\}', "{shareGroup.Share.Id}", route)
+        path_expression = f'Route{self.config.expression_depth - 1}($"{path}") + APIVersion'
+        if verb == "Get":
+            request = f"Get({path_expression})"
+        else:
+            request = f"{verb}(new {{ }}.As(SerializationFormat.Json)).To({path_expression})"
+        return [
+            "        Send(",
+            f"            {request} with",
+            "            { Authorization = Bearer(token.AccessToken) }",
+            "        );",
+        ]
@@ -1,14 +1,124 @@
 from __future__ import annotations
 
-import tree_sitter_c_sharp as tscs
 import re
+import mmap
+import bisect
+import threading
 
 from Interpreter import Interpreter
 from Types import Callable, ExpressionBioledMethod
 from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
 from tree_sitter import Language, Parser, Tree, Node
 from Environment import Environment
-from special_nodes import Send
+from special_nodes import CS_LANGUAGE, CallSites, Send
+from status_codes import status_code
+
+
+class ParserPool:
+    """
+    A process-wide pool of C# parsers.
+    A tree-sitter Parser must not be used by two threads at once, so each borrower
+    gets its own parser and hands it back when the parse is done.
+    """
+    def __init__(self, language: Language = CS_LANGUAGE):
+        self.language = language
+        self._idle: list[Parser] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Parser:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return Parser(self.language)
+
+    def release(self, parser: Parser):
+        with self._lock:
+            self._idle.append(parser)
+
+    @contextmanager
+    def borrow(self) -> Iterator[Parser]:
+        parser = self.acquire()
+        try:
+            yield parser
+        finally:
+            self.release(parser)
+
+
+PARSER_POOL = ParserPool()
+
+# What CSFile parses: text, or the UTF-8 bytes of a file as bytes, a buffer or a memory map
+SourceCode = str | bytes | bytearray | memoryview | mmap.mmap
+
+NEWLINE_PATTERN = re.compile(b'\n')
+
+
+def as_bytes(source_code: SourceCode) -> bytes | bytearray | mmap.mmap:
+    """
+    The source as an object whose slices are bytes: text is encoded, anything else is used as it is, not copied.
+    A memoryview is replaced by the object it views when it views all of it, since its own slices cannot be decoded.
+    """
+    if isinstance(source_code, str):
+        return source_code.encode()
+    if isinstance(source_code, memoryview):
+        viewed = source_code.obj
+        if source_code.contiguous and isinstance(viewed, (bytes, bytearray, mmap.mmap)) and source_code.nbytes == len(viewed):
+            return viewed
+        return source_code.tobytes()
+    return source_code
+
+
+class LineIndex:
+    """
+    The byte offset at which every line of a source file starts.
+    Built once per file and shared by every class and method in it, so that
+    line lookups never need to re-decode or re-split the source.
+    """
+    def __init__(self, source: bytes | bytearray | mmap.mmap):
+        self.source = source
+        # Each line starts one byte after a newline. re scans any buffer, memory maps included, without copying it
+        self.line_starts = [0] + [match.end() for match in NEWLINE_PATTERN.finditer(source)]
+
+    def line_start(self, line_number: int) -> int:
+        """Byte offset of the start of a 1-based line number, or the end of the source past the last line."""
+        if line_number > len(self.line_starts):
+            return len(self.source)
+        return self.line_starts[line_number - 1]
+
+    def line_number(self, byte_offset: int) -> int:
+        """1-based line number of the line containing byte_offset."""
+        return bisect.bisect_right(self.line_starts, byte_offset)
+
+    def point(self, byte_offset: int) -> tuple[int, int]:
+        """0-based (row, byte column) of byte_offset, as tree-sitter describes positions."""
+        row = self.line_number(byte_offset) - 1
+        return row, byte_offset - self.line_starts[row]
+
+
+def _edited_range(old: bytes, new: bytes) -> tuple[int, int, int]:
+    """
+    (start, old end, new end) of the single edit that turns old into new: everything before start
+    and everything after the ends is common to both. Prefixes are compared by bisection, so the comparisons run in C.
+    """
+    def common_length(a: bytes, b: bytes, limit: int) -> int:
+        low, high = 0, limit
+        while low < high:
+            middle = (low + high + 1) // 2
+            if a[:middle] == b[:middle]:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    start = common_length(old, new, min(len(old), len(new)))
+    # The common suffix may not overlap the common prefix
+    suffix = common_length(old[::-1], new[::-1], min(len(old), len(new)) - start)
+    return start, len(old) - suffix, len(new) - suffix
+
+
+def _touches(node: Node, ranges: list[tuple[int, int]]) -> bool:
+    """Whether one of the byte ranges overlaps or borders the node"""
+    return any(start <= node.end_byte and node.start_byte <= end for start, end in ranges)
 
 
 class CSFile:
@@ -17,12 +127,20 @@ class CSFile:
     Intakes a file path and parses the file into a tree.
     Intakes a Environment object that contains the global variables and methods.
     Read the file and stores the variables and methodsin a Environment object. 
+    A pre-built parser can be passed in, otherwise one is borrowed from PARSER_POOL.
+    The source can be text, or bytes, a buffer or a memory map of the UTF-8 file, which are parsed without a copy:
+    only the slices of it that are needed are decoded.
     """
-    def __init__(self, source_code: str, environment: Environment):
-        self.source = source_code.encode()
-        self.language = Language(tscs.language())
-        self.parser = Parser(self.language)
-        self.tree = self.parser.parse(self.source)
+    def __init__(self, source_code: SourceCode, environment: Environment, parser: Parser | None = None):
+        self.source = as_bytes(source_code)
+        self.language = CS_LANGUAGE
+        if parser is not None:
+            self.tree = parser.parse(self.source)
+        else:
+            with PARSER_POOL.borrow() as pooled_parser:
+                self.tree = pooled_parser.parse(self.source)
+        self.line_index = LineIndex(self.source)
+        self.call_sites = CallSites(self.tree.root_node)
         self.environment = Environment(environment)
         self.using_directives = []  # Store using directives
         
@@ -32,6 +150,60 @@ class CSFile:
         # Parse file level declarations
         self._parse_file_level_declarations()
     
+    def reparse(self, source_code: SourceCode, parser: Parser | None = None) -> list[tuple[int, int]]:
+        """
+        Bring the file up to date with a new version of its source, for watch mode.
+        The previous tree is edited and handed to the parser, so the reparse is incremental, and only the
+        classes and methods whose text changed are analyzed again: the others are moved to their new position.
+        Returns the byte ranges of the new source that changed.
+        """
+        source = as_bytes(source_code)
+        if source == self.source:
+            return []
+        start, old_end, new_end = _edited_range(self.source, source)
+        line_index = LineIndex(source)
+        old_tree = self.tree
+        old_tree.edit(
+            start_byte=start, old_end_byte=old_end, new_end_byte=new_end,
+            start_point=self.line_index.point(start), old_end_point=self.line_index.point(old_end),
+            new_end_point=line_index.point(new_end),
+        )
+        with (nullcontext(parser) if parser is not None else PARSER_POOL.borrow()) as parser:
+            self.tree = parser.parse(source, old_tree)
+            if self.tree.root_node.has_error:
+                # Error recovery depends on the previous tree: a file with syntax errors is parsed afresh,
+                # to be read the same way as when it is first opened
+                self.tree = parser.parse(source)
+                old_tree = None
+        if old_tree is None:
+            changed = [(0, len(source))]
+        else:
+            # changed_ranges only covers changes in structure, not edits inside a token such as a string
+            changed = [(r.start_byte, r.end_byte) for r in old_tree.changed_ranges(self.tree)] + [(start, new_end)]
+
+        self.source = source
+        self.line_index = line_index
+        self.call_sites = CallSites(self.tree.root_node)
+        root_node = self.tree.root_node
+        class_nodes = [child for child in root_node.children if child.type == "class_declaration"]
+        file_level_changed = any(child.type != "class_declaration" and _touches(child, changed) for child in root_node.children)
+        if file_level_changed or [self._extract_class_name(node) for node in class_nodes] != list(self.environment.classes):
+            # File level variables, or the classes themselves, changed: every class may see different values
+            self.environment = Environment(self.environment.enclosing)
+            self.using_directives = []
+            self._parse_using_directives()
+            self._parse_file_level_declarations()
+            return changed
+
+        for node in class_nodes:
+            csharp_class = self.environment.classes[self._extract_class_name(node)]
+            assert(isinstance(csharp_class, CSClass))
+            if not _touches(node, changed):
+                csharp_class._move(node, self.source, self.call_sites)
+            elif not csharp_class._reparse_methods(node, self.source, self.call_sites, changed):
+                self._parse_class_declaration(node)
+        return changed
+
     def get_classes(self) -> Iterator['CSClass']:
         """
         Yield all classes in the file, in the order they were added to the environment.
@@ -43,7 +215,6 @@ class CSFile:
     def _parse_using_directives(self):
         """Parse using_directive nodes from the compilation unit"""
         root_node = self.tree.root_node
-        root_node_text = self.source[root_node.start_byte:root_node.end_byte].decode()
         for child in root_node.children:
             if child.type == "using_directive":
                 using_text = self.source[child.start_byte:child.end_byte].decode()
@@ -78,24 +249,19 @@ class CSFile:
                         var_value = ""
                         children = iter(decl_child.children)
                         for item in children:
-                            item_text = self.source[item.start_byte:item.end_byte].decode()
                             if item.type == "identifier":
                                 var_name = self.source[item.start_byte:item.end_byte].decode()
                             elif item.type == "=":
+                                # The value node comes after '='
                                 item = next(children)
 
-                                # Get the value after '='
-                                value_text = self.source[item.start_byte:item.end_byte].decode()
-                                # Remove '=' and whitespace
-                                value_text = value_text.lstrip('=').strip()
-
-                                # Evaluate the value using CSEvaluator if needed
+                                # Evaluate the value from its node
                                 # private string new_name = "key" + name; // this should be evaluated to get keyvalue
                                 # private string another_name = name; // this should be evaluated to get name
                                 # private string yet_another_name = "another" + "name"; // this should be evaluated to get anothername
                                 # private string yet_another_name_name = $"another{name}"; // this should be evaluated to get anothername
                                 
-                                var_value = Interpreter.evaluate(item, value_text, self.environment)
+                                var_value = Interpreter.evaluate_node(item, self.environment)
                         if var_name:
                             # Store the variable in the environment
                             self.environment.define_variable(var_name, var_value)
@@ -105,15 +271,16 @@ class CSFile:
         """
         Parse a class_declaration node and add variables to the environment.
         """
-        def _extract_class_name(node: Node) -> str:
-            for child in node.children:
-                if child.type == "identifier" and child.text:
-                    return child.text.decode()
-            raise Exception(f"Class name not found in {node}")
-        
-        csharp_class = CSClass(_extract_class_name(node), node, self.source, self.environment)
+        csharp_class = CSClass(self._extract_class_name(node), node, self.source, self.environment, self.call_sites)
         self.environment.define_class(csharp_class.name, csharp_class)
 
+    @staticmethod
+    def _extract_class_name(node: Node) -> str:
+        for child in node.children:
+            if child.type == "identifier" and child.text:
+                return child.text.decode()
+        raise Exception(f"Class name not found in {node}")
+
 
     def _traverse(self) -> Iterator[Node]:
         cursor = self.tree.walk()
@@ -143,11 +310,12 @@ class CSClass(Callable):
     A class that represents a C# class.
     Intakes a node, source, and environment.
     """
-    def __init__(self, name: str, node: Node, source: bytes, environment: Environment):
+    def __init__(self, name: str, node: Node, source: bytes, environment: Environment, call_sites: CallSites | None = None):
         super().__init__(name, "class", 0)
 
         self.node = node
         self.source = source
+        self.call_sites = call_sites or CallSites(node)
         self.environment = Environment(environment)
         self.attributes: list[str] = []  # Store class attributes
         self.super_class_name: str = ""
@@ -157,9 +325,13 @@ class CSClass(Callable):
         # Extract attributes first
         self._extract_attributes()
         
-        # Parse class members
-        self._parse_class_members()
+        # Parse class members in a single pass. Their values are lazy variables, so a member that refers to
+        # one declared after it evaluates that one first. Fields that were not looked up are evaluated here, once;
+        # zero-arity members (Endpoint => ...) are left until they are read.
         self._parse_class_members()
+        self.environment.evaluate_lazy_variables(
+            name for name in self.environment.lazy_values if name not in self.environment.callables
+        )
     
     def _extract_attributes(self):
         """Extract attribute_list nodes and superclass name from the class declaration"""
@@ -231,30 +403,27 @@ class CSClass(Callable):
                         var_type = self.source[decl_child.start_byte:decl_child.end_byte].decode().strip()
                     elif decl_child.type == "variable_declarator":
                         var_name = None
-                        var_value = ""
+                        value_node = None
                         children = iter(decl_child.children)
                         for item in children:
-                            item_text = self.source[item.start_byte:item.end_byte].decode()
                             if item.type == "identifier":
                                 var_name = self.source[item.start_byte:item.end_byte].decode()
                             elif item.type == "=":
-                                item = next(children)
-                                # Get the value after '='
-                                value_text = self.source[item.start_byte:item.end_byte].decode()
-                                # Remove '=' and whitespace
-                                value_text = value_text.lstrip('=').strip()
-                                # Evaluate the value
-                                var_value = Interpreter.evaluate(item, value_text, self.environment)
-                        if var_name:
-                            # Store the variable in the class environment
-                            self.environment.define_variable(var_name, var_value)
+                                # The value node comes after '='
+                                value_node = next(children)
+                        if var_name and value_node is not None:
+                            # Store the variable in the class environment, evaluated from its node when first needed
+                            self.environment.define_lazy_variable(var_name, self._evaluate_later(value_node))
+                        elif var_name:
+                            self.environment.define_variable(var_name, "")
     
-    def _parse_method_declaration(self, node: Node):
-        """Parse a method_declaration node"""
+    def _parse_method_declaration(self, node: Node, call_sites: CallSites | None = None):
+        """Parse a method_declaration node. A block-bodied method looks up its calls in call_sites, the class's by default."""
         method_name = None
         method_type = None
         parameter_list = []
         expression_body = None
+        expression_node = None
         has_block = False
         
         # Parse method components
@@ -267,9 +436,8 @@ class CSClass(Callable):
                 parameter_list = self._parse_parameter_list(child)
             elif child.type == "arrow_expression_clause":
                 # Expression-bodied method
-                expression_text = self.source[child.start_byte:child.end_byte].decode()
-                # Remove the '=>' and trim
-                expression_body = expression_text.lstrip('=>').strip()
+                expression_node = child.children[-1]
+                expression_body = self.source[expression_node.start_byte:expression_node.end_byte].decode().strip()
             elif child.type == "block":
                 has_block = True
         
@@ -283,12 +451,15 @@ class CSClass(Callable):
                     method_type or "void", 
                     len(parameter_list), 
                     expression_body, 
-                    param_names
+                    param_names,
+                    Interpreter.compile_node(expression_node),
+                    self.environment
                 )
                 self.environment.define_method(method_name, method)
             elif has_block:
                 # Create CSMethod for regular methods
-                method = CSMethod(method_name, method_type or "void", len(parameter_list), node, self.source, self.environment)
+                method = CSMethod(method_name, method_type or "void", len(parameter_list), node, self.source, self.environment,
+                                  call_sites or self.call_sites)
                 self.environment.define_method(method_name, method)
     
     def _parse_property_declaration(self, node: Node):
@@ -296,7 +467,9 @@ class CSClass(Callable):
         property_name = None
         property_type = None
         expression_body = None
-        equals_value = None
+        expression_node = None
+        equals_value_node = None
+        is_auto_property = False
         
         # Parse property components
         for child in node.children:
@@ -306,14 +479,18 @@ class CSClass(Callable):
                 property_name = self.source[child.start_byte:child.end_byte].decode()
             elif child.type == "arrow_expression_clause":
                 # Expression-bodied property: private string Endpoint => $"{GlobalLabShare}/gl-share/api/Admin/share";
-                expression_text = self.source[child.start_byte:child.end_byte].decode()
-                # Remove the '=>' and trim
-                expression_body = expression_text.lstrip('=>').strip()
+                expression_node = child.children[-1]
+                expression_body = self.source[expression_node.start_byte:expression_node.end_byte].decode().strip()
+            elif child.type == "accessor_list":
+                # Auto-property: public static int DefaultPageSize { get; set; }
+                is_auto_property = all(accessor.type != "accessor_declaration" or accessor.child_by_field_name("body") is None
+                                       for accessor in child.children)
+            elif child.type == "=":
+                # Auto-property with initializer: public static int DefaultPageSize { get; set; } = 50;
+                equals_value_node = child.next_sibling
             elif child.type == "equals_value_clause":
                 # Property with initializer: private string Endpoint = "value";
-                equals_text = self.source[child.start_byte:child.end_byte].decode()
-                # Remove the '=' and trim
-                equals_value = equals_text.lstrip('=').strip()
+                equals_value_node = child.children[-1]
         
         if property_name:
             if expression_body:
@@ -324,13 +501,21 @@ class CSClass(Callable):
                     property_type or "object",
                     0,  # No parameters
                     expression_body,
-                    []  # No parameter names
+                    [],  # No parameter names
+                    Interpreter.compile_node(expression_node),
+                    self.environment
                 )
                 self.environment.define_method(property_name, method)
-            elif equals_value:
+            elif equals_value_node:
                 # Handle property with initializer as a variable
-                evaluated_value = Interpreter.evaluate(None, equals_value, self.environment)
-                self.environment.define_variable(property_name, evaluated_value)
+                self.environment.define_lazy_variable(property_name, self._evaluate_later(equals_value_node))
+            elif is_auto_property:
+                # Like a field declared without a value
+                self.environment.define_variable(property_name, "")
+
+    def _evaluate_later(self, node: Node):
+        """The evaluation of a member's value node in the class environment, for define_lazy_variable"""
+        return lambda: Interpreter.evaluate_node(node, self.environment)
     
     def _parse_parameter_list(self, node: Node) -> list:
         """Parse a parameter_list node and return list of parameter info"""
@@ -360,6 +545,59 @@ class CSClass(Callable):
             }
         return None
 
+    @staticmethod
+    def _block_method_nodes(node: Node) -> dict[str, Node]:
+        """The method_declaration nodes with a block body under a class_declaration node, by method name"""
+        method_nodes = {}
+        members = []
+        for child in node.children:
+            members += child.children if child.type == "declaration_list" else [child]
+        for member in members:
+            for declaration in (member.children if member.type == "member_declaration" else [member]):
+                body = declaration.child_by_field_name("body") if declaration.type == "method_declaration" else None
+                if body is None or body.type != "block":
+                    continue
+                for child in declaration.children:
+                    if child.type == "identifier" and child.text:
+                        method_nodes[child.text.decode()] = declaration
+                        break
+        return method_nodes
+
+    def _block_methods(self) -> dict[str, 'CSMethod']:
+        return {name: method for name, method in self.environment.callables.items() if isinstance(method, CSMethod)}
+
+    def _move(self, node: Node, source: bytes, call_sites: CallSites,
+              method_nodes: dict[str, Node] | None = None):
+        """Point the class and its methods at their text in a new version of the file, where it is unchanged."""
+        self.node, self.source, self.call_sites = node, source, call_sites
+        methods = self._block_methods()
+        for name, method_node in (method_nodes or self._block_method_nodes(node)).items():
+            if name in methods:
+                methods[name]._move(method_node, source, call_sites)
+
+    def _reparse_methods(self, node: Node, source: bytes, call_sites: CallSites,
+                         changed: list[tuple[int, int]]) -> bool:
+        """
+        Analyze again only the methods the changed byte ranges fall in, when every change inside the class
+        is inside one of its block-bodied methods. Returns False, leaving the class as it was, otherwise.
+        """
+        methods = self._block_methods()
+        method_nodes = self._block_method_nodes(node)
+        if method_nodes.keys() != methods.keys():
+            return False
+        edited = {name: method_node for name, method_node in method_nodes.items() if _touches(method_node, changed)}
+        for start, end in changed:
+            if start <= node.end_byte and node.start_byte <= end and not any(
+                    method_node.start_byte <= start and end <= method_node.end_byte for method_node in edited.values()):
+                return False
+
+        self._move(node, source, call_sites,
+                   {name: method_node for name, method_node in method_nodes.items() if name not in edited})
+        for method_node in edited.values():
+            # The file's call sites are only looked up in an edited method: finding its own is much cheaper
+            self._parse_method_declaration(method_node, CallSites(method_node))
+        return True
+
     def get_test_methods(self) -> Iterator['CSMethod']:
         for method in self.environment.callables.values():
             if not isinstance(method, CSMethod):
@@ -378,23 +616,50 @@ class CSMethod(Callable):
     """
     A class that represents a C# method with a block body.
     """
-    def __init__(self, name: str, _type: str, arity: int, node: Node, source: bytes, environment: Environment):
+    # Weakly referenceable for the attributes watch mode keeps per method
+    __slots__ = ("node", "source", "call_sites", "environment", "attributes", "default_response_code",
+                 "_method_environment", "_send_functions", "__weakref__")
+
+    def __init__(self, name: str, _type: str, arity: int, node: Node, source: bytes, environment: Environment,
+                 call_sites: CallSites | None = None):
         super().__init__(name, _type, arity)
         self.node = node
         self.source = source
+        self.call_sites = call_sites or CallSites(node)
         self.environment = environment
         self.attributes = []  # Store method attributes
-        self.method_environment = Environment(environment)  # Method-specific environment
-        self.send_functions: list[Send] = []  # Store Send function objects
         self.default_response_code = self._get_default_response_code()
         
         # Extract attributes
         self._extract_attributes()
-        # Parse variables from statements
-        self._parse_method_variables()
-        # Parse Send function calls
-        self._parse_send_functions()
+        # The body is only interpreted on first use of method_environment or send_functions,
+        # so methods that are not tests, or are skipped, cost little more than their attributes
+        self._method_environment: Environment | None = None
+        self._send_functions: list[Send] | None = None
+
+    @property
+    def method_environment(self) -> Environment:
+        """Method-specific environment, with the variables declared in the method body"""
+        if self._method_environment is None:
+            self._method_environment = Environment(self.environment)
+            self._parse_method_variables()
+        return self._method_environment
+
+    @property
+    def send_functions(self) -> list[Send]:
+        """Send function objects, with the Verify statements after each counted"""
+        if self._send_functions is None:
+            self._send_functions = []
+            self._parse_send_functions()
+        return self._send_functions
     
+    def _move(self, node: Node, source: bytes, call_sites: CallSites):
+        """Point the method at its unchanged text in a new version of the file, shifting the lines of its Sends."""
+        line_shift = node.start_point[0] - self.node.start_point[0]
+        self.node, self.source, self.call_sites = node, source, call_sites
+        for send in self._send_functions or []:
+            send.line_number += line_shift
+
     def _get_default_response_code(self):
         """Get the default response code for the method from the name of the method"""
         # GET_AdminBlacklist_NoAuth_401_106508
@@ -423,97 +688,45 @@ class CSMethod(Callable):
                 self.attributes.append(attr_text)
     
     def _parse_send_functions(self):
-        """Parse Send function calls from statement nodes and create Send objects."""
-        for stmt_node in self.iterate_statements():
-            # Look for invocation_expression nodes that might be Send calls
-            self._find_send_calls_in_node(stmt_node)
+        """Create Send objects for the Send calls in the method body, keeping the first Send of each line."""
+        block_node = self._find_block()
+        if not block_node:
+            return
+        send_lines = set()
+        for send_node in self.call_sites.find("send", block_node.start_byte, block_node.end_byte):
+            try:
+                send_obj = Send(send_node, self.source, self.method_environment, self.call_sites)
+                if send_obj.line_number not in send_lines:
+                    send_lines.add(send_obj.line_number)
+                    send_obj.default_response_code = self.default_response_code
+                    self.send_functions.append(send_obj)
+            except Exception as e:
+                print(f"Debug: Error parsing Send function: {e}")
 
         # After all Send nodes are found, count Verify statements after each
         self._count_verify_statements_after_send()
 
     def _count_verify_statements_after_send(self):
-        """For each Send node, count the number of Verify statements after it, up to the next Send or end of method."""
+        """For each Send node, count the lines with a Verify statement after it, up to the next Send or end of method."""
         if not self.send_functions:
             return
-        # Get the method source lines
-        method_lines = self.source[0:self.node.end_byte].decode().split('\n')
-        # Map: line number (1-based, relative to method start) -> Send object
         send_line_numbers = [(send.line_number, send) for send in self.send_functions]
         send_line_numbers.sort(key=lambda x: x[0])  # ascending order by line number
+        verify_lines = [node.start_point[0] + 1 for node in self.call_sites.find("verify", self.node.start_byte, self.node.end_byte)]
+        status_codes = self.call_sites.find("status", self.node.start_byte, self.node.end_byte)
+        method_end_line = self.node.end_point[0] + 1
         # For each Send, count Verify statements after it
         for idx, (send_line, send_obj) in enumerate(send_line_numbers):
-            # Determine the end line: next Send or end of method
-            
-            if idx + 1 < len(send_line_numbers):
-                end_line = send_line_numbers[idx + 1][0]
-            else:
-                end_line = len(method_lines) + 1  # past the end
-            count = 0
+            last_line = send_line_numbers[idx + 1][0] - 1 if idx + 1 < len(send_line_numbers) else method_end_line
+            send_obj.verify_count_after = len({line for line in verify_lines if send_line <= line <= last_line})
+            # The first Verify(Response.StatusCode).Is(...) in the range
             found_code = None
-            for i in range(send_line, end_line):
-                if i-1 < len(method_lines):
-                    line = method_lines[i-1]
-                    if 'Verify(' in line:
-                        count += 1
-                    # Look for Verify(Response.StatusCode).Is(...)
-                    m = re.search(r'Verify\(\s*Response\.StatusCode\s*\)\.Is\(([^)]+)\)', line)
-                    if m and found_code is None:
-                        found_code = m.group(1).strip()
-            send_obj.verify_count_after = count
-
-            if found_code == "OK":
-                found_code = "200"
-            elif found_code == "Created":
-                found_code = "201"
-            elif found_code == "NoContent":
-                found_code = "204"
-            elif found_code == "BadRequest":
-                found_code = "400"
-            elif found_code == "Unauthorized":
-                found_code = "401"
-            elif found_code == "Forbidden":
-                found_code = "403"
-            elif found_code == "NotFound":
-                found_code = "404"
-            elif found_code == "Gone":
-                found_code = "410"
-            elif found_code == "InternalServerError":
-                found_code = "500"
-        
+            for code_node in status_codes:
+                if send_line <= code_node.start_point[0] + 1 <= last_line:
+                    found_code = status_code(code_node.text.decode())
+                    break
             send_obj.expected_code = found_code
     
-    def _find_send_calls_in_node(self, node: Node):
-        """Recursively search for Send function calls in a node and its children."""
-        # Check if this node is a Send call
-        if self._is_send_call(node):
-            try:
-                send_obj = Send(node, self.source, self.method_environment)
-                exists = False
-                for _send in self.send_functions:
-                    if _send.line_number == send_obj.line_number:
-                        exists = True
-                        break
-                if not exists:
-                    send_obj.default_response_code = self.default_response_code
-                    self.send_functions.append(send_obj)
-            except Exception as e:
-                print(f"Debug: Error parsing Send function: {e}")
-  
-        # Recursively check children
-        for child in node.children:
-            self._find_send_calls_in_node(child)
-    
-    def _is_send_call(self, node: Node) -> bool:
-        """Check if a node represents a Send function call."""
-        if node.type != "invocation_expression":
-            return False
-        
-        # Get the text of the node
-        node_text = self.source[node.start_byte:node.end_byte].decode()
-        
-        # Check if it starts with "Send("
-        return node_text.strip().startswith("Send(")
-    
     def _parse_method_variables(self):
         """Parse variable declarations from statement nodes and store in method environment if evaluable."""
         for stmt_node in self.iterate_statements():
@@ -541,12 +754,11 @@ class CSMethod(Callable):
                                         # The next child is the value node
                                         if i + 1 < len(children):
                                             value_node = children[i + 1]
-                                            value_text = self.source[value_node.start_byte:value_node.end_byte].decode().strip()
                                             try:
-                                                evaluated = Interpreter.evaluate(value_node, value_text, self.method_environment)
+                                                evaluated = Interpreter.evaluate_node(value_node, self.method_environment)
                                                 var_value = evaluated
                                             except Exception:
-                                                var_value = value_text
+                                                var_value = self.source[value_node.start_byte:value_node.end_byte].decode().strip()
                                             i += 2
                                             continue
                                         else:
@@ -561,12 +773,7 @@ class CSMethod(Callable):
         Iterator that yields statement nodes from the method body one at a time.
         Each element is a node representing an entire statement.
         """
-        # Find the block node (method body)
-        block_node = None
-        for child in self.node.children:
-            if child.type == "block":
-                block_node = child
-                break
+        block_node = self._find_block()
         if not block_node:
             return  # No method body found
         # In the C# grammar, statements are direct children of the block node
@@ -579,3 +786,10 @@ class CSMethod(Callable):
     def get_method_environment(self) -> Environment:
         """Get the method-specific environment containing variables"""
         return self.method_environment
+
+    def _find_block(self) -> Node | None:
+        """The block node (method body)"""
+        for child in self.node.children:
+            if child.type == "block":
+                return child
+        return None
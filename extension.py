@@ -1,10 +1,22 @@
 import os
-import re
-import glob
-from cs import CSFile, CSClass, CSMethod
+import io
+import sys
+import json
+import argparse
+import contextlib
+import collections
+from typing import TextIO
+from collections.abc import Iterator, MutableMapping
+from concurrent.futures import Future, ProcessPoolExecutor
+from tree_sitter import Parser
+from cs import CSFile, CSClass, CSMethod, LineIndex, PARSER_POOL, SourceCode, as_bytes
+from cache import SwaggerCache, content_key
+from scanner import FileScanner
 from special_nodes import Send
-from helper import create_globals, globals, PathResolver, paths
-from Environment import Environment
+from status_codes import METHOD_NAME_STATUS_CODES
+from summary import Decisions, FileSummary, MethodSummary
+from helper import global_environment, PathResolver, paths
+from Environment import CallCache
 
 r'''
 C:\Users\sulabh.katila\source\repos\glshare\Tests\API\Share\Share_shareLink.cs
@@ -23,101 +35,248 @@ geolocation = f"{root_root}\\Geolocation"
 
 
 class SwaggerAdder:
-    def __init__(self, cs_dir: str):
+    """
+    Add Swagger attributes to the API test methods of the files under cs_dir.
+    With dry_run "diff" or "json" no file is written: the edits are written to edits (standard output by default)
+    as one unified diff for the whole run, or as one JSON object per file, in the order the scanner yields the files.
+    """
+    def __init__(self, cs_dir: str, parser: Parser | None = None, cache: SwaggerCache | None = None, scanner: FileScanner | None = None,
+                 dry_run: str | None = None, edits: TextIO | None = None):
         self.start_at = cs_dir
+        self.dry_run = dry_run
+        self.edits = edits or sys.stdout
         self.path_resolver = PathResolver(paths)
+        self.globals = global_environment
+        self.parser = parser
+        self.cache = cache
+        self.scanner = scanner or FileScanner()
 
-    def process_all(self, start_at: str | None = None):
+    def process_all(self, start_at: str | None = None, jobs: int = 1) -> list[tuple[str, list[str]]]:
+        """Process every candidate file under start_at and return (file path, changes) pairs in scanner order."""
+        return [(summary.path, summary.changes) for summary in self.stream(start_at, jobs)]
+
+    def stream(self, start_at: str | None = None, jobs: int = 1) -> Iterator[FileSummary]:
+        """
+        Process every candidate file under start_at and yield the summary of each, in scanner order.
+        Files are streamed from the scanner; with jobs > 1 they are fanned out to a pool of worker processes.
+        A file's tree and source are released before its summary is yielded and nothing else is kept,
+        so memory does not grow with the number of files.
+        """
         if start_at is None:
             start_at = self.start_at
 
-        if os.path.isfile(start_at):
-            return self.process_file(start_at)
-        
-        for entry in os.listdir(start_at):
-            self.process_all(os.path.join(start_at, entry))
+        # Each file is read once: the content the scanner read for its marker check is passed on
+        files = self.scanner.scan_sources(start_at)
+        if jobs <= 1:
+            yield from (self.process_file(file_path, source) for file_path, source in files)
+        else:
+            yield from self._process_in_parallel(files, jobs)
 
-    def process_file(self, file_path):
-        print(f"Processing file: {file_path}")
+        if self.cache is not None:
+            self.cache.save()
+
+    def _process_in_parallel(self, files: Iterator[tuple[str, bytes | None]], jobs: int) -> Iterator[FileSummary]:
+        # Bound the files in flight so that memory does not grow with the size of the tree
+        max_pending = jobs * 4
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(self.start_at, self.dry_run)) as executor:
+            pending = collections.deque()
+            for file_path, source in files:
+                # Cache lookups happen here so that only the misses are shipped to the workers
+                key, summary = None, None
+                if self.cache is not None:
+                    if source is None:
+                        with open(file_path, 'rb') as f:
+                            source = f.read()
+                    key, summary = self.lookup_summary(file_path, source)
+                future = executor.submit(_process_file_in_worker, file_path, source) if summary is None else None
+                pending.append((file_path, source, key, summary, future))
+                while len(pending) > max_pending:
+                    yield self._collect(*pending.popleft())
+
+            while pending:
+                yield self._collect(*pending.popleft())
+
+    def _collect(self, file_path: str, source: bytes | None, key: str | None, summary: FileSummary | None,
+                 future: Future | None) -> FileSummary:
+        """
+        Finish one file of a parallel run. Files are collected in submission order,
+        so the output stays in scanner order regardless of which worker finishes first.
+        """
+        if future is None:
+            assert(source is not None and summary is not None)
+            print(f"Processing file: {file_path} (cached)")
+            self.apply_decisions(file_path, source, summary.decisions())
+        else:
+            output, summary, edits = future.result()
+            print(output, end='')
+            self.edits.write(edits)
+            if self.cache is not None and key is not None:
+                self.cache.put(key, summary.as_rows())
+        return summary
+
+    def process_file(self, file_path: str, source: bytes | None = None) -> FileSummary:
+        """Analyze a file, whose content is source when it was already read, and write or describe its attributes."""
+        # The UTF-8 bytes are analyzed and edited as they are, never decoded as a whole
+        if source is None:
+            with open(file_path, 'rb') as f:
+                source = f.read()
+
+        key, summary = self.lookup_summary(file_path, source)
+        if summary is not None:
+            print(f"Processing file: {file_path} (cached)")
+        else:
+            print(f"Processing file: {file_path}")
+            summary = self.summarize_source(source, file_path)
+            if self.cache is not None and key is not None:
+                self.cache.put(key, summary.as_rows())
+
+        self.apply_decisions(file_path, source, summary.decisions())
+        return summary
+
+    def lookup_summary(self, file_path: str, source: bytes) -> tuple[str | None, FileSummary | None]:
+        """Return the cache key of source and the cached summary of the file, if any."""
+        if self.cache is None:
+            return None, None
+        key = content_key(source)
+        rows = self.cache.get(key)
+        return key, FileSummary.from_rows(file_path, rows) if rows is not None else None
+
+    def apply_decisions(self, file_path: str, source: SourceCode, decisions: Decisions) -> list[str]:
+        """Write the decided attributes into the file, whose current content is source, or describe them in a dry run."""
+        line_changes, changes = decisions
+        if len(line_changes) > 0:
+            if self.dry_run is None:
+                self.insert_swagger_attribute(file_path, source, line_changes)
+            else:
+                self.edits.write(self.describe_edits(file_path, source, line_changes))
+        return changes
 
-        line_changes: list[list[str]] = []
-        with open(file_path, 'r', encoding='utf-8') as f:
-            source = f.read()
-        source = source.replace(" { get; set; } ", " ")
-        source = source.replace("{ get; set; }", "")
-        source = source.replace("{get;set}", "")
-        source = source.replace("{get;set; }", "")
-        source = source.replace("{get;set;}", "")
-        source = source.replace("{get;set; }", "")
-
-        env = create_globals(globals)
-        environment = Environment(env)
-        cs_file = CSFile(source, environment)
-        lines = source.split('\n')
-        changes = []
+    def analyze_source(self, source: SourceCode, file_path: str) -> Decisions:
+        """Parse and interpret a file and decide which Swagger attributes to add to its test methods."""
+        return self.summarize_source(source, file_path).decisions()
+
+    def summarize_source(self, source: SourceCode, file_path: str) -> FileSummary:
+        """Parse and interpret a file and reduce it to the summary of its test methods."""
+        cs_file = CSFile(as_bytes(source), self.globals, self.parser)
+        return self.summarize(cs_file, file_path)
+
+    def decide(self, cs_file: CSFile, file_path: str,
+               summaries: MutableMapping[CSMethod, MethodSummary] | None = None) -> Decisions:
+        """Decide which Swagger attributes to add to the test methods of a parsed file, as summarize() does."""
+        return self.summarize(cs_file, file_path, summaries).decisions()
+
+    def summarize(self, cs_file: CSFile, file_path: str,
+                  summaries: MutableMapping[CSMethod, MethodSummary] | None = None) -> FileSummary:
+        """
+        Summarize the test methods of the API test classes of a parsed file,
+        whose source is the file as it is on disk, where the attributes are inserted.
+        The summary of each method is looked up in, and added to, summaries when given, so that
+        methods kept by CSFile.reparse are not decided again.
+        """
+        file_summary = FileSummary(file_path)
         for csharp_class in cs_file.get_classes():
             if not self.is_api_test_class(csharp_class):
                 continue
 
             for method in csharp_class.get_test_methods():
-                if self.has_swagger_attribute(method):
-                    continue
-
-                send_obj = self.select_best_send(method, method.name)
-                if not send_obj:
-                    print("NO SEND OBJECT FOUND FOR METHOD", method.name)                
-                    continue
-                    
-                path_var = self.path_resolver.get_var_for_path(str(send_obj.evaluated_path))
-
-                op_type = send_obj.get_request_type()
-                resp_code = send_obj.expected_code
-                if op_type is None:
-                    print("NO OPERATION TYPE FOUND FOR METHOD", method.name, "IN FILE", file_path)
-                    continue
-                
-                if resp_code is None:
-                    resp_code = send_obj.default_response_code
-
-                if path_var is not None and path_var != "None":
-                    swagger_attr = f"[Swagger(Path = Paths.{path_var}, Operation = OperationType.{op_type.capitalize()}, ResponseCode = {resp_code})]"
-                    # Insert above method declaration
-                    method_line = self.find_method_declaration_line(lines, method.name)
-
-                    assert(method_line is not None)
-                    # change this
-                    line_changes.append([method_line, swagger_attr])
-                    changes.append(f"{method.name}: {swagger_attr}")
+                # Attributes are inserted above the method declaration
+                offset = cs_file.line_index.line_start(self.method_declaration_line(method))
+                if summaries is None:
+                    method_summary = self.summarize_method(csharp_class.name, method, file_path, offset)
+                elif method in summaries:
+                    method_summary = summaries[method].at(offset)
+                else:
+                    method_summary = summaries[method] = self.summarize_method(csharp_class.name, method, file_path, offset)
+                file_summary.methods.append(method_summary)
 
-        if len(line_changes) > 0:
-            self.insert_swagger_attribute(file_path, line_changes)
+        return file_summary
 
-        if changes:
-            return ('\n'.join(lines), changes)
-        return (None, [])
+    def summarize_method(self, class_name: str, method: CSMethod, file_path: str, offset: int) -> MethodSummary:
+        """
+        The Send chosen for a test method and the Swagger attribute to add to it, if it needs one and its path is known.
+        A method that already has an attribute is not analyzed.
+        """
+        summary = MethodSummary(class_name, method.name, offset)
+        if self.has_swagger_attribute(method):
+            return summary
 
+        send_obj = self.select_best_send(method, method.name)
+        if not send_obj:
+            print("NO SEND OBJECT FOUND FOR METHOD", method.name)
+            return summary
 
-    def insert_swagger_attribute(self, filename: str, changes: list[list[str]]):
-        with open(filename, 'r', encoding='utf-8') as f:
-            file = f.read()
-        
-        for line, attr in changes:
-            # Get leading whitespace from the original line
-            m = re.match(r"^\s*", line)
-            leading_ws = m.group(0) if m else ''
-            file = file.replace(line, f"{leading_ws}{attr}\n{line}")
-        
+        path_var = self.path_resolver.get_var_for_path(str(send_obj.evaluated_path))
+
+        op_type = send_obj.get_request_type()
+        resp_code = send_obj.expected_code
+        summary.request_type = op_type
+        summary.path = None if send_obj.evaluated_path is None else str(send_obj.evaluated_path)
+        if op_type is None:
+            print("NO OPERATION TYPE FOUND FOR METHOD", method.name, "IN FILE", file_path)
+            return summary
+
+        if resp_code is None:
+            resp_code = send_obj.default_response_code
+        summary.code = resp_code
+
+        if path_var is not None and path_var != "None":
+            summary.attribute = f"[Swagger(Path = Paths.{path_var}, Operation = OperationType.{op_type.capitalize()}, ResponseCode = {resp_code})]"
+        return summary
+
+
+    def swagger_edits(self, source_bytes: bytes, changes: list[tuple[int, str]]) -> list[tuple[int, str]]:
+        """
+        The insertions, as (byte offset, text) pairs in offset order, that add each attribute at its offset,
+        indented like the line it goes above, and the Swagger and OpenAPI using directives if they are missing.
+        Inserted lines end like the lines of the file, with \r\n or \n.
+        """
+        edits = []
+        newline = "\r\n" if source_bytes.find(b"\r\n") != -1 else "\n"
         if len(changes) > 0:
-            has_swagger_namespace = file.find(SWAGGER_NAMESPACE)
-            has_openapi_namespace = file.find(OPENAPI_NAMESPACE)
-            if has_swagger_namespace == -1:
-                file = SWAGGER_NAMESPACE + "\n" + file
-            if has_openapi_namespace == -1:
-                file = OPENAPI_NAMESPACE + "\n" + file
-        
-        with open(filename, 'w', encoding='utf-8') as f:
+            namespaces = "".join(f"{namespace}{newline}" for namespace in (OPENAPI_NAMESPACE, SWAGGER_NAMESPACE)
+                                 if source_bytes.find(namespace.encode()) == -1)
+            if namespaces:
+                edits.append((0, namespaces))
+        for offset, attr in sorted(changes):
+            # Get leading whitespace from the original line
+            indent_end = offset
+            while indent_end < len(source_bytes) and source_bytes[indent_end] in b' \t':
+                indent_end += 1
+            edits.append((offset, source_bytes[offset:indent_end].decode() + attr + newline))
+        return edits
+
+    @staticmethod
+    def apply_edits(source_bytes: bytes, edits: list[tuple[int, str]]) -> bytes:
+        """Make the insertions of swagger_edits in a single pass."""
+        pieces = []
+        position = 0
+        for offset, text in edits:
+            pieces.append(source_bytes[position:offset])
+            pieces.append(text.encode())
+            position = offset
+        pieces.append(source_bytes[position:])
+        return b''.join(pieces)
+
+    def insert_swagger_attribute(self, filename: str, source: SourceCode, changes: list[tuple[int, str]]):
+        """Insert each attribute at its byte offset, with any missing using directives, and write the file."""
+        source_bytes = as_bytes(source)
+        file = self.apply_edits(source_bytes, self.swagger_edits(source_bytes, changes))
+        with open(filename, 'wb') as f:
             f.write(file)
 
+    def describe_edits(self, filename: str, source: SourceCode, changes: list[tuple[int, str]]) -> str:
+        """
+        The edits insert_swagger_attribute would make, as a unified diff of the file or as a JSON line
+        with the byte offset and text of each insertion, depending on dry_run.
+        """
+        source_bytes = as_bytes(source)
+        edits = self.swagger_edits(source_bytes, changes)
+        path = os.path.relpath(filename).replace(os.sep, '/')
+        if self.dry_run == "json":
+            return json.dumps({"file": path, "edits": [{"offset": offset, "text": text} for offset, text in edits]}) + "\n"
+
+        return _unified_diff(path, source_bytes, edits)
+
 
     def is_api_test_class(self, csharp_class: CSClass):
         if 'APITest' in csharp_class.super_class_name:
@@ -130,11 +289,12 @@ class SwaggerAdder:
     def has_swagger_attribute(self, method):
         return any('Swagger(' in str(attr) for attr in getattr(method, 'attributes', []))
 
-    def find_method_declaration_line(self, lines: list[str], method_name: str) -> str | None:
-        for i, line in enumerate(lines):
-            if f'public void {method_name}(' in line or f'public async Task {method_name}(' in line:
-                return line
-        return None
+    def method_declaration_line(self, method: CSMethod) -> int:
+        """1-based line of the method declaration itself (its modifiers), below any attributes and comments between them."""
+        for child in method.node.children:
+            if child.type not in ("attribute_list", "comment"):
+                return child.start_point[0] + 1
+        return method.node.start_point[0] + 1
 
     def select_best_send(self, method: CSMethod, method_name: str) -> Send | None:
         sends = getattr(method, 'send_functions', [])
@@ -169,26 +329,115 @@ class SwaggerAdder:
         if parts:
             if parts[0].upper() in ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']:
                 op_type = parts[0].capitalize()
-            # Look for a part that is a number or a known code
-            for p in parts:
-                if p.isdigit() and len(p) == 3:
-                    resp_code = p
-                elif p.upper() in ['OK', 'UNAUTHORIZED', 'FORBIDDEN', 'NOTFOUND', 'BADREQUEST', 'CREATED', 'GONE']:
-                    resp_code = p.capitalize()
+            # Look for a part that is a number or a known status name; a number wins over a name
+            codes = [p for p in parts if p.isdigit() and len(p) == 3]
+            if codes:
+                resp_code = codes[-1]
+            else:
+                # A name is only read where the code goes, after the verb and resource and before the test case id
+                position = len(parts) - 2 if parts[-1].isdigit() else len(parts) - 1
+                if position >= 2:
+                    resp_code = METHOD_NAME_STATUS_CODES.get(parts[position].lower())
         return op_type, resp_code
 
+
+def _unified_diff(path: str, source_bytes: bytes, edits: list[tuple[int, str]], context: int = 3) -> str:
+    """
+    The unified diff, laid out as difflib would, of inserting the text of each edit at its offset, which is the start of a line.
+    It is built from the insertion points alone: difflib's line matching grows quadratically with the number of insertions.
+    """
+    line_index = LineIndex(source_bytes)
+    line_starts = line_index.line_starts + [len(source_bytes)]
+    # A final newline does not start another line
+    line_count = len(line_index.line_starts) - (line_index.line_starts[-1] == len(source_bytes))
+
+    def source_line(line: int) -> str:
+        text = source_bytes[line_starts[line]:line_starts[line + 1]].decode()
+        return text if text.endswith("\n") else text + "\n\\ No newline at end of file\n"
+
+    def span(start: int, length: int) -> str:
+        if length == 1:
+            return f"{start + 1}"
+        if length == 0:
+            return f"{start},0"
+        return f"{start + 1},{length}"
+
+    inserted: dict[int, list[str]] = {}
+    for offset, text in edits:
+        inserted.setdefault(line_index.line_number(offset) - 1, []).extend(text.splitlines(keepends=True))
+    points = sorted(inserted)
+    if not points:
+        return ""
+
+    diff = [f"--- a/{path}\n", f"+++ b/{path}\n"]
+    added = 0
+    first = 0
+    while first < len(points):
+        # Insertions closer than twice the context share a hunk
+        last = first
+        while last + 1 < len(points) and points[last + 1] - points[last] <= 2 * context:
+            last += 1
+        start, end = max(points[first] - context, 0), min(points[last] + context, line_count)
+        hunk = []
+        for line in range(start, end + 1):
+            hunk += ["+" + text for text in inserted.get(line, [])]
+            if line < end:
+                hunk.append(" " + source_line(line))
+        hunk_added = sum(len(inserted[point]) for point in points[first:last + 1])
+        diff.append(f"@@ -{span(start, end - start)} +{span(start + added, end - start + hunk_added)} @@\n")
+        diff += hunk
+        added += hunk_added
+        first = last + 1
+    return "".join(diff)
+
+
+# Each worker process builds its SwaggerAdder (globals environment, path resolver and parser) once.
+_worker_adder: SwaggerAdder | None = None
+
+def _init_worker(cs_dir: str, dry_run: str | None = None):
+    global _worker_adder
+    _worker_adder = SwaggerAdder(cs_dir, PARSER_POOL.acquire(), dry_run=dry_run)
+
+def _process_file_in_worker(file_path: str, source: bytes | None = None) -> tuple[str, FileSummary, str]:
+    assert(_worker_adder is not None)
+    # Capture the per-file log, and the edits of a dry run, so the parent can write them in scanner order
+    output = io.StringIO()
+    _worker_adder.edits = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        if source is None:
+            with open(file_path, 'rb') as f:
+                source = f.read()
+        print(f"Processing file: {file_path}")
+        summary = _worker_adder.summarize_source(source, file_path)
+        _worker_adder.apply_decisions(file_path, source, summary.decisions())
+    return output.getvalue(), summary, _worker_adder.edits.getvalue()
+
+
 if __name__ == "__main__":
-    import sys
     import makepaths
 
-    if len(sys.argv) < 2:
+    arg_parser = argparse.ArgumentParser(description="Add Swagger attributes to C# API tests.")
+    arg_parser.add_argument("start_at", nargs="?", help="file or directory to process, or one of the named test folders")
+    arg_parser.add_argument("--jobs", "-j", type=int, default=1, help="number of worker processes")
+    arg_parser.add_argument("--no-cache", action="store_true", help="re-analyze every file instead of reusing cached results")
+    arg_parser.add_argument("--cache-file", default=".swagger_cache.json", help="where to keep the results cache")
+    arg_parser.add_argument("--cache-size", type=int, default=10000, help="maximum number of files kept in the cache")
+    arg_parser.add_argument("--include", action="append", help=f"glob of the files to process, can be repeated (default: {' '.join(FileScanner.DEFAULT_INCLUDE)})")
+    arg_parser.add_argument("--exclude", action="append", help=f"glob of the files and folders to skip, can be repeated (default: {' '.join(FileScanner.DEFAULT_EXCLUDE)})")
+    arg_parser.add_argument("--max-size", type=int, default=1_000_000, help="skip files larger than this many bytes")
+    arg_parser.add_argument("--dry-run", nargs="?", const="diff", choices=["diff", "json"],
+                            help="write no file: print the edits as a unified diff (the default) or as JSON lines, and the log to standard error")
+    arg_parser.add_argument("--watch", action="store_true", help="print the suggested attributes of each file whenever it is saved, without writing them")
+    args = arg_parser.parse_args()
+
+    if args.start_at is None:
         # start_at = "testfile.cs"
         start_at = "csfiles"
         current_dir = os.path.dirname(os.path.abspath(__file__))
         start_at = os.path.join(current_dir, start_at)
 
     else:
-        start_at = sys.argv[1]
+        start_at = args.start_at
 
         if start_at == "root_root":
             start_at = root_root
@@ -205,7 +454,25 @@ if __name__ == "__main__":
         elif start_at == "geolocation":
             start_at = geolocation
     
-    swagger_adder = SwaggerAdder(start_at)
+    scanner = FileScanner(args.include, args.exclude, args.max_size)
+    if args.watch:
+        from watch import watch
+        watch(lambda: scanner.scan(start_at), SwaggerAdder(start_at, scanner=scanner))
+    else:
+        cache = None if args.no_cache else SwaggerCache(args.cache_file, args.cache_size)
+        swagger_adder = SwaggerAdder(start_at, cache=cache, scanner=scanner, dry_run=args.dry_run, edits=sys.stdout)
+        if args.dry_run:
+            # Keep standard output for the edits
+            sys.stdout = sys.stderr
 
-    swagger_adder.process_all()
-    
+        # Each file's changes are printed as soon as it is processed, and then dropped
+        for summary in swagger_adder.stream(jobs=args.jobs):
+            for change in summary.changes:
+                print(f"{summary.path}: {change}")
+
+        print(scanner.report())
+        if cache is not None:
+            print(f"Cache: {cache.hits} hits, {cache.misses} misses")
+        if args.jobs == 1:
+            # Workers keep their own counts, so these are only complete when files are processed here
+            print(CallCache.report())
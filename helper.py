@@ -1,6 +1,9 @@
-from Environment import Environment
+from Environment import Environment, FrozenEnvironment
 import re
 
+# Returned by dict.pop for paths that are not cached, as None is cached for paths that resolve to nothing
+_missing = object()
+
 # from newvars.txt
 # plain path, and path with var
 
@@ -170,6 +173,9 @@ def create_globals(globals_str: str) -> Environment:
         env.define_variable(var_name, value)
     return env
 
+# The globals, built once per process and shared, frozen, by every file
+global_environment: FrozenEnvironment = create_globals(globals).freeze()
+
 def get_path_to_var(globals_str: str) -> dict:
     """
     Parse the globals string up to the line containing '# end of paths'.
@@ -194,7 +200,26 @@ def get_path_to_var(globals_str: str) -> dict:
         path_map[value.lower()] = var_name
     return path_map
 
+class PathTrieNode:
+    """A node of the PathResolver trie: one path segment."""
+    def __init__(self):
+        self.literals: dict[str, PathTrieNode] = {}
+        # Segments that are a single {param}
+        self.wildcard: PathTrieNode | None = None
+        # Segments mixing text and {param}s, such as file{id}.json
+        self.patterns: list[tuple[re.Pattern, PathTrieNode]] = []
+        # (declaration order, variable name) of the template ending here
+        self.template: tuple[int, str] | None = None
+
+
 class PathResolver:
+    """
+    Map paths to the name of the Paths constant they belong to.
+    Plain paths are looked up in a dict and templated paths in a segment trie built once,
+    so a lookup costs O(path segments) instead of one regex per template.
+    """
+    LOOKUP_CACHE_SIZE = 1024
+
     def __init__(self, paths_str: str):
         self.paths = {'plain': {}, 'formatted': {}}
         for line in paths_str.split('\n'):
@@ -212,7 +237,45 @@ class PathResolver:
             else:
                 self.paths['plain'][path_lc] = var_name
 
+        self.trie = PathTrieNode()
+        for order, (template, var_name) in enumerate(self.paths['formatted'].items()):
+            self._add_template(template, order, var_name)
+        self._lookup_cache: dict[str, str | None] = {}
+
+    def _add_template(self, template: str, order: int, var_name: str):
+        node = self.trie
+        for segment in template.split('/'):
+            if '{' not in segment:
+                node = node.literals.setdefault(segment, PathTrieNode())
+            elif re.fullmatch(r'\{[^}]+\}', segment):
+                if node.wildcard is None:
+                    node.wildcard = PathTrieNode()
+                node = node.wildcard
+            else:
+                regex = re.sub(r'\{[^}]+\}', r'[^/]+', re.escape(segment).replace(r'\{', '{').replace(r'\}', '}'))
+                for pattern, child in node.patterns:
+                    if pattern.pattern == regex:
+                        node = child
+                        break
+                else:
+                    child = PathTrieNode()
+                    node.patterns.append((re.compile(regex), child))
+                    node = child
+        # When the same template is declared twice the first declaration wins, as it did for the scan
+        if node.template is None:
+            node.template = (order, var_name)
+
     def get_var_for_path(self, path: str):
+        var_name = self._lookup_cache.pop(path, _missing)
+        if var_name is _missing:
+            var_name = self._get_var_for_path(path)
+        # Re-insert so that dict order doubles as least-recently-used order
+        self._lookup_cache[path] = var_name
+        if len(self._lookup_cache) > self.LOOKUP_CACHE_SIZE:
+            del self._lookup_cache[next(iter(self._lookup_cache))]
+        return var_name
+
+    def _get_var_for_path(self, path: str):
         path_lc = path.lower()
 
         # If path starts with http or https, strip to portion starting from /api
@@ -229,11 +292,30 @@ class PathResolver:
         # 1. Check plain paths
         if path_lc in self.paths['plain']:
             return self.paths['plain'][path_lc]
-        # 2. Check formatted paths
-        for template, var_name in self.paths['formatted'].items():
-            # Convert template to regex: replace {var} with [^/]+, escape the rest
-            regex = re.sub(r'\{[^}]+\}', r'[^/]+', re.escape(template).replace(r'\{', '{').replace(r'\}', '}'))
-            regex = '^' + regex + '$'
-            if re.match(regex, path_lc):
-                return var_name
-        return None
+        # 2. Check formatted paths; when several templates match, the one declared first wins
+        best = self._match(self.trie, path_lc.split('/'), 0)
+        return best[1] if best is not None else None
+
+    def _match(self, node: PathTrieNode, segments: list[str], index: int) -> tuple[int, str] | None:
+        if index == len(segments):
+            return node.template
+
+        segment = segments[index]
+        candidates = []
+        literal = node.literals.get(segment)
+        if literal is not None:
+            candidates.append(literal)
+        if segment:
+            # A {param} never matches an empty segment
+            if node.wildcard is not None:
+                candidates.append(node.wildcard)
+            for pattern, child in node.patterns:
+                if pattern.fullmatch(segment):
+                    candidates.append(child)
+
+        best = None
+        for child in candidates:
+            found = self._match(child, segments, index + 1)
+            if found is not None and (best is None or found[0] < best[0]):
+                best = found
+        return best
@@ -0,0 +1,93 @@
+import os
+from fnmatch import fnmatch
+from collections.abc import Iterator
+
+
+class FileScanner:
+    """
+    Walk a directory tree without recursion and yield the C# files worth parsing, in directory-walk order:
+    the entries of each directory are sorted by name and a subdirectory is walked where its name sorts,
+    so a/x.cs comes before a-b/x.cs. This is not the order of the sorted full paths, where a-b/x.cs is first.
+    A file is skipped when it is excluded, not included, larger than max_size bytes,
+    or does not mention the marker (APITest) anywhere in its text.
+    The number of files skipped by each filter is kept in skipped.
+    scan_sources also yields the content read for the marker check, so that it is not read twice.
+    """
+    DEFAULT_INCLUDE = ["*.cs"]
+    DEFAULT_EXCLUDE = ["bin", "obj", ".git", ".vs", "node_modules"]
+
+    def __init__(self, include: list[str] | None = None, exclude: list[str] | None = None,
+                 max_size: int | None = 1_000_000, marker: bytes | None = b"APITest"):
+        self.include = include if include is not None else self.DEFAULT_INCLUDE
+        self.exclude = exclude if exclude is not None else self.DEFAULT_EXCLUDE
+        self.max_size = max_size
+        self.marker = marker
+        self.scanned = 0
+        self.skipped = {"excluded": 0, "not included": 0, "too large": 0, "no marker": 0}
+
+    def scan(self, start_at: str) -> Iterator[str]:
+        """Yield the candidate files under start_at. A file given directly is always yielded."""
+        for file_path, _ in self.scan_sources(start_at):
+            yield file_path
+
+    def scan_sources(self, start_at: str) -> Iterator[tuple[str, bytes | None]]:
+        """
+        Yield the candidate files under start_at with their content, or None when it was not read:
+        without a marker, or for a file given directly, which is always yielded.
+        """
+        if os.path.isfile(start_at):
+            self.scanned += 1
+            yield start_at, None
+            return
+
+        # A stack of directory iterators replaces the recursion; entries are sorted so the order is stable
+        stack = [iter(self._sorted_entries(start_at))]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                continue
+
+            relative_path = os.path.relpath(entry.path, start_at).replace(os.sep, '/')
+            if self._matches(entry.name, relative_path, self.exclude):
+                self.skipped["excluded"] += 1
+                continue
+            if entry.is_dir():
+                stack.append(iter(self._sorted_entries(entry.path)))
+                continue
+            accepted, source = self._accept_file(entry, relative_path)
+            if accepted:
+                self.scanned += 1
+                yield entry.path, source
+
+    def _accept_file(self, entry: os.DirEntry, relative_path: str) -> tuple[bool, bytes | None]:
+        """Whether the file passes the filters, and its content if it was read to tell."""
+        if not self._matches(entry.name, relative_path, self.include):
+            self.skipped["not included"] += 1
+            return False, None
+        # Not entry.stat(), which would keep the result on every entry of the directory until it is done
+        if self.max_size is not None and os.stat(entry.path).st_size > self.max_size:
+            self.skipped["too large"] += 1
+            return False, None
+        if self.marker is None:
+            return True, None
+        # Much cheaper than parsing: a file that never mentions the marker cannot contain an API test class
+        with open(entry.path, 'rb') as f:
+            source = f.read()
+        if self.marker not in source:
+            self.skipped["no marker"] += 1
+            return False, None
+        return True, source
+
+    @staticmethod
+    def _sorted_entries(directory: str) -> list[os.DirEntry]:
+        with os.scandir(directory) as entries:
+            return sorted(entries, key=lambda entry: entry.name)
+
+    @staticmethod
+    def _matches(name: str, relative_path: str, patterns: list[str]) -> bool:
+        return any(fnmatch(name, pattern) or fnmatch(relative_path, pattern) for pattern in patterns)
+
+    def report(self) -> str:
+        skipped = ", ".join(f"{count} {reason}" for reason, count in self.skipped.items())
+        return f"Scanned {self.scanned} files, skipped: {skipped}"
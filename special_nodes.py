@@ -1,9 +1,113 @@
-from tree_sitter import Node
+import tree_sitter_c_sharp as tscs
+from tree_sitter import Language, Node, Query, QueryCursor
 from typing import Optional, Any
 
 import re
+import bisect
 from Interpreter import Interpreter
 
+# Loading the grammar is the expensive part of building a parser, so it is done once per process.
+CS_LANGUAGE = Language(tscs.language())
+
+# The HTTP methods a Send can use, in the order they are tried
+HTTP_METHOD_NAMES = ['Get', 'Post', 'Put', 'Delete', 'Patch', 'Head', 'Options']
+
+# Every pattern used to read a Send's text, compiled once
+# Any of the HTTP method names called, possibly generic: Get(...), Post<T>(...)
+HTTP_METHOD_CALL_PATTERN = re.compile(rf'\b({"|".join(HTTP_METHOD_NAMES)})\s*[<(]', re.IGNORECASE)
+# A leading HTTP method name
+HTTP_METHOD_PREFIX_PATTERN = re.compile(r'(Post|Put|Get|Delete|Patch|Head|Options)', re.IGNORECASE)
+# Each HTTP method name, as extract_method_argument looks for it
+HTTP_METHOD_NAME_PATTERNS = {name: re.compile(rf'\b{re.escape(name)}\s*', re.IGNORECASE) for name in HTTP_METHOD_NAMES}
+# A trailing "with { ... }" block, with or without the statement's semicolon
+WITH_BLOCK_STATEMENT_PATTERN = re.compile(r'with\s*\{[^}]*\}\s*;?$', re.DOTALL)
+WITH_BLOCK_PATTERN = re.compile(r'with\s*\{[^}]*\}\s*$', re.DOTALL)
+TO_CALL_PATTERN = re.compile(r'\.To\s*\(')
+TO_ARGUMENT_PATTERN = re.compile(r'\.\s*To\s*\(\s*([^)]+(?:\([^)]*\)[^)]*)*)\s*\)', re.DOTALL)
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# The call sites the analysis looks at, all found in one pass over the tree:
+# Send(...), Verify(...) or .Verify(...), Verify(Response.StatusCode).Is(code), the HTTP verb calls and .To(path)
+CALL_SITES_QUERY = Query(CS_LANGUAGE, """
+(invocation_expression
+  function: (identifier) @send (#eq? @send "Send"))
+
+(invocation_expression
+  function: [(identifier) @verify (member_access_expression name: (identifier) @verify)]
+  (#eq? @verify "Verify"))
+
+(invocation_expression
+  function: (member_access_expression
+    expression: (invocation_expression
+      function: [(identifier) @status_verify (member_access_expression name: (identifier) @status_verify)]
+      (#eq? @status_verify "Verify")
+      arguments: (argument_list
+        . (argument (member_access_expression) @status_subject (#eq? @status_subject "Response.StatusCode")) .))
+    name: (identifier) @status_is (#eq? @status_is "Is"))
+  arguments: (argument_list . (argument) @status))
+
+(invocation_expression
+  function: [(identifier) @verb (generic_name . (identifier) @verb)]
+  (#match? @verb "^(?i:get|post|put|delete|patch|head|options)$"))
+
+(invocation_expression
+  function: (member_access_expression
+    name: (identifier) @to (#eq? @to "To")))
+""")
+
+
+class CallSites:
+    """
+    The call sites of a tree, found by running CALL_SITES_QUERY once, on the first lookup, and sorted in source order
+    (outer calls first). Built once per file and shared by its classes, methods and Sends, which look up the call sites
+    inside their own byte range by bisection instead of walking their nodes.
+    Kinds: "send", "verify" (the Verify names) and "status" (the code argument of Verify(Response.StatusCode).Is(code)),
+    "verb" and "to" (invocations of Get/Post/... and of .To).
+    """
+    def __init__(self, node: Node):
+        self.node = node
+        self._nodes: dict[str, list[Node]] | None = None
+        self._starts: dict[str, list[int]] = {}
+
+    def _index(self):
+        captures = QueryCursor(CALL_SITES_QUERY).captures(self.node)
+        invocation = lambda name: name.parent if name.parent.type == "invocation_expression" else name.parent.parent
+        kinds = {
+            "send": [self._outermost_send(name) for name in captures.get("send", []) if self._called_directly(name)],
+            "verify": captures.get("verify", []),
+            "status": captures.get("status", []),
+            "verb": [invocation(name) for name in captures.get("verb", [])],
+            "to": [name.parent.parent for name in captures.get("to", [])],
+        }
+        self._nodes = {}
+        for kind, nodes in kinds.items():
+            unique = {(node.start_byte, -node.end_byte): node for node in nodes}
+            self._nodes[kind] = [unique[key] for key in sorted(unique)]
+            self._starts[kind] = [node.start_byte for node in self._nodes[kind]]
+
+    @staticmethod
+    def _called_directly(name: Node) -> bool:
+        """Send(...), not Send (...) or Send<T>(...)"""
+        return name.end_byte == name.parent.child_by_field_name("arguments").start_byte
+
+    @staticmethod
+    def _outermost_send(name: Node) -> Node:
+        """The outermost call that starts with Send(, so Send(...).Take(...) rather than the Send(...) inside it"""
+        send = node = name.parent
+        while node.parent is not None and node.parent.start_byte == send.start_byte:
+            node = node.parent
+            if node.type == "invocation_expression":
+                send = node
+        return send
+
+    def find(self, kind: str, start_byte: int, end_byte: int) -> list[Node]:
+        """The call sites of the given kind that start inside [start_byte, end_byte), in source order."""
+        if self._nodes is None:
+            self._index()
+        starts = self._starts[kind]
+        return self._nodes[kind][bisect.bisect_left(starts, start_byte):bisect.bisect_left(starts, end_byte)]
+
+
 def extract_send_content(text):
     start = text.find('Send(')
     if start == -1:
@@ -22,6 +126,12 @@ def extract_send_content(text):
         i += 1
     return ''.join(content).strip() if depth == 0 else None
 
+def remove_with_block(text: str, pattern: re.Pattern = WITH_BLOCK_PATTERN) -> str:
+    """Remove a trailing 'with { ... }' block. Texts without one are not scanned by the regex."""
+    if 'with' not in text:
+        return text.strip()
+    return pattern.sub('', text).strip()
+
 def extract_method_argument(content: str, method_name: str) -> Optional[str]:
     """
     Extract the argument from a method call using balanced parentheses parsing.
@@ -36,8 +146,8 @@ def extract_method_argument(content: str, method_name: str) -> Optional[str]:
     """
     try:
         # Find the method name
-        method_pattern = rf'\b{re.escape(method_name)}\s*'
-        match = re.search(method_pattern, content, re.IGNORECASE)
+        method_pattern = HTTP_METHOD_NAME_PATTERNS.get(method_name) or re.compile(rf'\b{re.escape(method_name)}\s*', re.IGNORECASE)
+        match = method_pattern.search(content)
         if not match:
             return None
         
@@ -96,15 +206,17 @@ class Send:
     Parses Send(Post(...).To(...)) or Send(Put(...).To(...)) or Send(Get().To(...)) or Send(Head(...).To(...))
     and extracts the REQUEST_TYPE and PATH.
     """
-    
-    def __init__(self, node: Node, source_bytes: bytes, environment=None):
+    __slots__ = ("node", "call_sites", "source_bytes", "environment", "request_type", "path", "evaluated_path",
+                 "line_number", "verify_count_after", "expected_code", "default_response_code")
+
+    def __init__(self, node: Node, source_bytes: bytes, environment=None, call_sites: CallSites | None = None):
         self.node = node
+        self.call_sites = call_sites
         self.source_bytes = source_bytes
         self.environment = environment
         self.request_type = None  # POST, PUT, GET
         self.path = None  # The argument to To()
         self.evaluated_path = None  # The evaluated path using the environment
-        self.raw_text = None  # Store the raw text for debugging
         self.line_number = node.start_point[0] + 1  # 1-based line number
         self.verify_count_after = 0  # Number of Verify statements after this Send
         self.expected_code: Any = None  # Expected response code after this Send
@@ -115,18 +227,15 @@ class Send:
     def _parse_send_function(self):
         """Parse the Send function to extract REQUEST_TYPE and PATH, handling 'with { ... }' blocks."""
         try:
-            # Get the text of the Send function call
-            self.raw_text = self.source_bytes[self.node.start_byte:self.node.end_byte].decode()
-            
             # Remove any trailing 'with { ... }' block for parsing
-            cleaned_text = re.sub(r'with\s*\{[^}]*\}\s*;?$', '', self.raw_text, flags=re.DOTALL).strip()
+            cleaned_text = remove_with_block(self.raw_text, WITH_BLOCK_STATEMENT_PATTERN)
             
             # Extract the argument inside Send(...)
             inner_content = extract_send_content(cleaned_text)
             if not inner_content:
                 return
             # Remove any trailing 'with { ... }' block from the inner_content
-            cleaned_inner_content = re.sub(r'with\s*\{[^}]*\}\s*$', '', inner_content, flags=re.DOTALL).strip()
+            cleaned_inner_content = remove_with_block(inner_content)
             
             # Try new style first: Get(path), Post(obj).To(path), etc.
             if self._parse_new_style(cleaned_inner_content):
@@ -139,8 +248,8 @@ class Send:
             # Evaluate the path if possible
             if self.path and self.environment is not None:
                 try:
-                    # Use Interpreter.evaluate to resolve the path
-                    self.evaluated_path = Interpreter.evaluate(None, self.path, self.environment)
+                    # Evaluate from the path's node when it can be found, the text otherwise
+                    self.evaluated_path = Interpreter.evaluate(self._find_path_node(), self.path, self.environment)
                     # Strip quotes if present
                     if (isinstance(self.evaluated_path, str) and self.evaluated_path.startswith('"') and self.evaluated_path.endswith('"')):
                         self.evaluated_path = self.evaluated_path[1:-1]
@@ -149,22 +258,73 @@ class Send:
         except Exception as e:
             print(f"Debug: Error parsing Send function: {e}")
 
+    @property
+    def raw_text(self) -> str:
+        """The text of the Send function call, read from the source when needed rather than kept"""
+        return self.source_bytes[self.node.start_byte:self.node.end_byte].decode()
+
+    def _find_path_node(self) -> Optional[Node]:
+        """
+        Find the node of the path that was extracted from the text: the argument of Get(...),
+        otherwise the argument of .To(...), otherwise the argument of the HTTP method call.
+        Returns None if the node does not match the extracted path.
+        """
+        if self.request_type is None or self.path is None:
+            return None
+
+        # Send(...).Take(...): descend to the Send(...) call itself
+        send_call = self.node
+        while True:
+            if send_call.type != "invocation_expression":
+                return None
+            function = send_call.child_by_field_name("function")
+            if function.type == "identifier":
+                break
+            if function.type != "member_access_expression":
+                return None
+            send_call = function.child_by_field_name("expression")
+
+        call_sites = self.call_sites or CallSites(send_call)
+        arguments = send_call.child_by_field_name("arguments")
+        verb_call = None
+        for node in call_sites.find("verb", arguments.start_byte, arguments.end_byte):
+            # Get(...) or Post<T>(...)
+            function = node.child_by_field_name("function")
+            name = function if function.type == "identifier" else function.children[0]
+            if name.text.decode().upper() == self.request_type:
+                verb_call = node
+                break
+        to_calls = call_sites.find("to", arguments.start_byte, arguments.end_byte)
+        to_call = to_calls[0] if to_calls else None
+
+        path_call = verb_call if self.request_type == 'GET' else (to_call or verb_call)
+        if path_call is None:
+            return None
+        for argument in path_call.child_by_field_name("arguments").children:
+            if argument.type == "argument":
+                path_node = argument.children[-1]
+                if WHITESPACE_PATTERN.sub(' ', path_node.text.decode()) == WHITESPACE_PATTERN.sub(' ', self.path):
+                    return path_node
+                return None
+        return None
+
     def _parse_new_style(self, content: str) -> bool:
         """Try to parse new style: Get(path), Post(obj).To(path), etc. Returns True if successful."""
         try:
             # Try to match HTTP methods: Get, Post, Put, Delete, Patch, Head, Options
-            method_names = ['Get', 'Post', 'Put', 'Delete', 'Patch', 'Head', 'Options']
-            
-            for method_name in method_names:
+            # Find which of them are called with a single scan of the content
+            called = {match.group(1).lower() for match in HTTP_METHOD_CALL_PATTERN.finditer(content)}
+
+            for method_name in HTTP_METHOD_NAMES:
                 # First, check if this method exists in the content
-                if re.search(rf'\b{re.escape(method_name)}\s*[<(]', content, re.IGNORECASE):
+                if method_name.lower() in called:
                     # Extract the argument using balanced parentheses parser
                     arg = extract_method_argument(content, method_name)
                     if arg is not None:
                         self.request_type = method_name.upper()
                         
                         # Remove any trailing 'with { ... }' block from the argument
-                        cleaned_arg = re.sub(r'with\s*\{[^}]*\}\s*$', '', arg, flags=re.DOTALL).strip()
+                        cleaned_arg = remove_with_block(arg)
                         
                         # For Get(path), path is the argument
                         if self.request_type == 'GET':
@@ -173,7 +333,7 @@ class Send:
                         
                         # For Delete(path), Patch(data), etc., check if .To(path) is present
                         # If .To(path) is present, use old style
-                        if re.search(r'\.To\s*\(', content):
+                        if TO_CALL_PATTERN.search(content):
                             return False
                         
                         # For Post(obj), Put(obj), Patch(data), etc., path may not be present directly
@@ -194,7 +354,7 @@ class Send:
             # Handle both single-line and multi-line patterns
             # Also handle generic types like Post<List<Recipient>>
             # Use a simpler approach - just look for the HTTP method name
-            request_match = re.match(r'(Post|Put|Get|Delete|Patch|Head|Options)', content.strip(), re.IGNORECASE)
+            request_match = HTTP_METHOD_PREFIX_PATTERN.match(content.strip())
             if request_match:
                 self.request_type = request_match.group(1).upper()
             else:
@@ -226,16 +386,16 @@ class Send:
                 if depth == 0:
                     path_arg = ''.join(path_content).strip()
                     # Clean up the path argument (remove extra whitespace, newlines)
-                    path_arg = re.sub(r'\s+', ' ', path_arg)
+                    path_arg = WHITESPACE_PATTERN.sub(' ', path_arg)
                     self.path = path_arg
                     return
             
             # Fallback to regex for simpler cases
-            to_match = re.search(r'\.\s*To\s*\(\s*([^)]+(?:\([^)]*\)[^)]*)*)\s*\)', content, re.DOTALL)
+            to_match = TO_ARGUMENT_PATTERN.search(content)
             if to_match:
                 path_arg = to_match.group(1).strip()
                 # Clean up the path argument (remove extra whitespace, newlines)
-                path_arg = re.sub(r'\s+', ' ', path_arg)
+                path_arg = WHITESPACE_PATTERN.sub(' ', path_arg)
                 self.path = path_arg
             else:
                 pass
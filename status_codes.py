@@ -0,0 +1,50 @@
+import re
+
+# Every System.Net.HttpStatusCode member, with its aliases
+HTTP_STATUS_CODES = {
+    "Continue": 100, "SwitchingProtocols": 101, "Processing": 102, "EarlyHints": 103,
+    "OK": 200, "Created": 201, "Accepted": 202, "NonAuthoritativeInformation": 203, "NoContent": 204,
+    "ResetContent": 205, "PartialContent": 206, "MultiStatus": 207, "AlreadyReported": 208, "IMUsed": 226,
+    "MultipleChoices": 300, "Ambiguous": 300, "MovedPermanently": 301, "Moved": 301, "Found": 302, "Redirect": 302,
+    "SeeOther": 303, "RedirectMethod": 303, "NotModified": 304, "UseProxy": 305, "Unused": 306,
+    "TemporaryRedirect": 307, "RedirectKeepVerb": 307, "PermanentRedirect": 308,
+    "BadRequest": 400, "Unauthorized": 401, "PaymentRequired": 402, "Forbidden": 403, "NotFound": 404,
+    "MethodNotAllowed": 405, "NotAcceptable": 406, "ProxyAuthenticationRequired": 407, "RequestTimeout": 408,
+    "Conflict": 409, "Gone": 410, "LengthRequired": 411, "PreconditionFailed": 412, "RequestEntityTooLarge": 413,
+    "RequestUriTooLong": 414, "UnsupportedMediaType": 415, "RequestedRangeNotSatisfiable": 416,
+    "ExpectationFailed": 417, "MisdirectedRequest": 421, "UnprocessableEntity": 422, "UnprocessableContent": 422,
+    "Locked": 423, "FailedDependency": 424, "UpgradeRequired": 426, "PreconditionRequired": 428,
+    "TooManyRequests": 429, "RequestHeaderFieldsTooLarge": 431, "UnavailableForLegalReasons": 451,
+    "InternalServerError": 500, "NotImplemented": 501, "BadGateway": 502, "ServiceUnavailable": 503,
+    "GatewayTimeout": 504, "HttpVersionNotSupported": 505, "VariantAlsoNegotiates": 506, "InsufficientStorage": 507,
+    "LoopDetected": 508, "NotExtended": 510, "NetworkAuthenticationRequired": 511,
+}
+
+# Status expressions in the code are matched case insensitively
+STATUS_CODES_BY_NAME = {name.lower(): str(code) for name, code in HTTP_STATUS_CODES.items()}
+
+# Status names that are also ordinary words in test method names, such as GET_Share_Moved_1
+AMBIGUOUS_STATUS_NAMES = {
+    "Continue", "Processing", "Accepted", "Ambiguous", "Moved", "Found", "Redirect", "Unused", "Locked",
+}
+
+# The status names read from a test method name, by lower-case name: GET_Share_NotFound_49482, GET_Share_Ok_12
+METHOD_NAME_STATUS_CODES = {
+    name.lower(): str(code) for name, code in HTTP_STATUS_CODES.items() if name not in AMBIGUOUS_STATUS_NAMES
+}
+
+# Leading casts: (int)HttpStatusCode.OK, (HttpStatusCode)404
+CAST_PATTERN = re.compile(r'^(?:\s*\(\s*[\w.]+\s*\))+')
+
+
+def status_code(text: str | None) -> str | None:
+    """
+    The numeric code, as a string, of a status written as OK, HttpStatusCode.NotFound, System.Net.HttpStatusCode.OK,
+    (int)HttpStatusCode.OK, (HttpStatusCode)404 or 404. None if it is not a known status.
+    """
+    if not text:
+        return None
+    name = CAST_PATTERN.sub('', text).strip().rsplit('.', 1)[-1]
+    if name.isdigit():
+        return name if len(name) == 3 else None
+    return STATUS_CODES_BY_NAME.get(name.lower())
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+# The Swagger attributes to insert into a file: ([byte offset, attribute] pairs, change descriptions)
+# The byte offsets are those of the method declaration lines in the UTF-8 encoded file.
+Decisions = tuple[list[tuple[int, str]], list[str]]
+
+
+class MethodSummary:
+    """
+    What the analysis decided for one test method: the verb, evaluated path and response code of the Send it chose,
+    the byte offset of its declaration line and the Swagger attribute to insert there, if any.
+    It keeps no tree, node or source, so it can outlive the parsed file.
+    """
+    __slots__ = ("class_name", "name", "request_type", "path", "code", "offset", "attribute")
+
+    def __init__(self, class_name: str, name: str, offset: int, request_type: str | None = None, path: str | None = None,
+                 code: str | None = None, attribute: str | None = None):
+        self.class_name = class_name
+        self.name = name
+        self.offset = offset
+        self.request_type = request_type
+        self.path = path
+        self.code = code
+        self.attribute = attribute
+
+    def at(self, offset: int) -> MethodSummary:
+        """The same decision for the method moved to another offset."""
+        if offset == self.offset:
+            return self
+        return MethodSummary(self.class_name, self.name, offset, self.request_type, self.path, self.code, self.attribute)
+
+    def as_row(self) -> list:
+        return [self.class_name, self.name, self.offset, self.request_type, self.path, self.code, self.attribute]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MethodSummary):
+            return NotImplemented
+        return self.as_row() == other.as_row()
+
+    def __repr__(self):
+        return f"MethodSummary({', '.join(repr(value) for value in self.as_row())})"
+
+
+class FileSummary:
+    """
+    A file reduced to the summaries of its test methods, in source order, once its tree and source are released.
+    Stored in the cache and returned by worker processes as rows of plain values.
+    """
+    __slots__ = ("path", "methods")
+
+    def __init__(self, path: str, methods: list[MethodSummary] | None = None):
+        self.path = path
+        self.methods = methods if methods is not None else []
+
+    @property
+    def line_changes(self) -> list[tuple[int, str]]:
+        return [(method.offset, method.attribute) for method in self.methods if method.attribute is not None]
+
+    @property
+    def changes(self) -> list[str]:
+        return [f"{method.name}: {method.attribute}" for method in self.methods if method.attribute is not None]
+
+    def decisions(self) -> Decisions:
+        return self.line_changes, self.changes
+
+    def as_rows(self) -> list[list]:
+        return [method.as_row() for method in self.methods]
+
+    @staticmethod
+    def from_rows(path: str, rows: list[list]) -> FileSummary:
+        return FileSummary(path, [MethodSummary(*row) for row in rows])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FileSummary):
+            return NotImplemented
+        return self.path == other.path and self.methods == other.methods
+
+    def __repr__(self):
+        return f"FileSummary({self.path!r}, {self.methods!r})"
@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+
+from cache import SwaggerCache, content_key
+from extension import SwaggerAdder
+
+
+def test_cache_evicts_least_recently_used():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SwaggerCache(os.path.join(cache_dir, "cache.json"), max_entries=2)
+        cache.put("a", ([], ["a"]))
+        cache.put("b", ([], ["b"]))
+        assert(cache.get("a") is not None)
+        cache.put("c", ([], ["c"]))
+
+        assert(cache.get("b") is None)
+        assert(cache.get("a") is not None)
+        assert(cache.get("c") is not None)
+        assert(cache.hits == 3 and cache.misses == 1)
+
+        cache.save()
+        reloaded = SwaggerCache(cache.path, max_entries=2)
+        assert(list(reloaded.entries) == ["a", "c"])
+
+
+def test_unchanged_file_is_not_reanalyzed():
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = SwaggerCache(os.path.join(work_dir, "cache.json"))
+        file_path = os.path.join(work_dir, "testfile.cs")
+        shutil.copy("testfile.cs", file_path)
+        with open(file_path, 'r', encoding='utf-8') as f:
+            original = f.read()
+
+        first = SwaggerAdder(file_path, cache=cache).process_all()
+        with open(file_path, 'r', encoding='utf-8') as f:
+            rewritten = f.read()
+        assert(cache.misses == 1 and cache.hits == 0)
+        assert(content_key(original) in cache.entries)
+
+        # Restore the original content, the second run must reuse the cached decisions
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(original)
+        second_cache = SwaggerCache(cache.path)
+        second = SwaggerAdder(file_path, cache=second_cache).process_all()
+        with open(file_path, 'r', encoding='utf-8') as f:
+            assert(f.read() == rewritten)
+        assert(second_cache.hits == 1 and second_cache.misses == 0)
+        assert(first == second)
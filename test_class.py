@@ -23,13 +23,6 @@ def test_class_environment():
     with open("testfile.cs", "r") as file:
         cs_file_content = file.read()
 
-    cs_file_content = cs_file_content.replace(" { get; set; } ", " ")
-    cs_file_content = cs_file_content.replace("{ get; set; }", "")
-    cs_file_content = cs_file_content.replace("{get;set}", "")
-    cs_file_content = cs_file_content.replace("{get;set; }", "")
-    cs_file_content = cs_file_content.replace("{get;set;}", "")
-    cs_file_content = cs_file_content.replace("{get;set; }", "")
-
     cs_file = CSFile(cs_file_content, global_env)
     classes_seen = 0
 
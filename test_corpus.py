@@ -0,0 +1,18 @@
+import io
+import contextlib
+
+from corpus import CorpusConfig, CorpusGenerator
+from extension import SwaggerAdder
+
+
+def test_generated_corpus_is_annotated():
+    config = CorpusConfig(files=2, classes_per_file=2, methods_per_class=3, sends_per_method=2, expression_depth=3)
+    source = CorpusGenerator(config).generate_source()
+    assert(source == CorpusGenerator(config).generate_source())
+    assert(source.count("Send(") == 2 * 3 * 2)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        line_changes, changes = SwaggerAdder("Generated.cs").analyze_source(source, "Generated.cs")
+    # Every generated test method resolves to a swagger.json path
+    assert(len(line_changes) == 2 * 3)
+    assert(all("[Swagger(Path = Paths." in change for change in changes))
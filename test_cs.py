@@ -0,0 +1,288 @@
+import mmap
+import tempfile
+
+from cs import CSFile, LineIndex
+from Environment import Environment
+from Interpreter import Interpreter
+from Types import ExpressionBioledMethod
+from helper import create_globals, globals
+
+global_env: Environment = create_globals(globals)
+
+
+def test_line_index():
+    source = "first\nsecond\n\nfourth".encode()
+    line_index = LineIndex(source)
+    assert(line_index.line_starts == [0, 6, 13, 14])
+    assert(line_index.line_start(2) == 6)
+    assert(line_index.line_start(5) == len(source))
+    assert(line_index.line_number(0) == 1)
+    assert(line_index.line_number(6) == 2)
+    assert(line_index.line_number(15) == 4)
+
+
+def test_verify_counts():
+    with open("testfile.cs", "r") as file:
+        cs_file = CSFile(file.read(), global_env)
+    for c in cs_file.get_classes():
+        for m in c.get_test_methods():
+            verify_counts = {s.line_number: s.verify_count_after for s in m.send_functions}
+            assert(verify_counts == {18: 3, 27: 0, 33: 4})
+
+
+def test_call_sites():
+    source = """
+    public sealed class Admin : APITest
+    {
+        [Test]
+        public void GET_Admin_200_1()
+        {
+            Send(Get(Endpoint)).Take(1);
+            Verify(Response.StatusCode).Is(NotFound);
+            Send(Post<Item>(new { }).To(Endpoint)).Verify(Response.StatusCode).Is(OK); Send(Get(Endpoint));
+            Verify(Response.Content).IsNot(null);
+        }
+    }
+    """
+    cs_file = CSFile(source, global_env)
+    c = next(cs_file.get_classes())
+    assert(c.call_sites is cs_file.call_sites)
+    m = next(c.get_test_methods())
+    assert(m.call_sites is cs_file.call_sites)
+    # One Send per line, the outermost call
+    sends = [(s.line_number, s.request_type, s.node.text.decode().split(".")[-1], s.verify_count_after, s.expected_code) for s in m.send_functions]
+    assert(sends == [(7, "GET", "Take(1)", 1, "404"), (9, "POST", "Is(OK)", 2, "200")])
+
+
+def test_methods_and_sends_have_no_instance_dict():
+    source = """
+    public sealed class Admin : APITest
+    {
+        private string Endpoint => $"{GlobalLabShare}/api/Admin";
+
+        [Test]
+        public void GET_Admin_200_1()
+        {
+            Send(Get(Endpoint) with { Authorization = Bearer(token) });
+        }
+    }
+    """
+    c = next(CSFile(source, global_env).get_classes())
+    m = next(c.get_test_methods())
+    send = m.send_functions[0]
+    for obj in (m, send, c.environment.callables["Endpoint"]):
+        assert(not hasattr(obj, "__dict__"))
+    assert(send.raw_text == "Send(Get(Endpoint) with { Authorization = Bearer(token) })")
+    assert(send.evaluated_path == "https://qa-share.transperfect.com/api/Admin")
+
+
+def test_method_bodies_are_interpreted_lazily():
+    source = """
+    public sealed class Admin : APITest
+    {
+        private string Endpoint => $"{GlobalLabShare}/gl-share/api/Admin";
+        public void Helper()
+        {
+            var url = Endpoint;
+        }
+        [Test]
+        public void GET_Admin_200_1()
+        {
+            var url = Endpoint;
+            Send(Get(url));
+        }
+    }
+    """
+    c = next(CSFile(source, global_env).get_classes())
+    helper = c.environment.get_method("Helper")
+    test = next(c.get_test_methods())
+    assert(helper._method_environment is None and helper._send_functions is None)
+    assert(test._method_environment is None and test._send_functions is None)
+
+    assert(test.send_functions[0].evaluated_path == "https://qa-share.transperfect.com/gl-share/api/Admin")
+    assert(test.method_environment.get_variable("url") == "https://qa-share.transperfect.com/gl-share/api/Admin")
+    assert(helper._method_environment is None)
+
+
+def test_class_members_are_evaluated_once():
+    # Each member refers to one declared after it
+    source = """
+    public sealed class Admin : APITest
+    {
+        private string Endpoint => $"{Share}/disability";
+        private string Share = $"{Base}/share";
+        private string Base = Root + "/api/Admin";
+        private string Root => $"{GlobalLabShare}/gl-share";
+    }
+    """
+    evaluated = []
+    evaluate_node = Interpreter.evaluate_node
+    call = ExpressionBioledMethod.call
+
+    def counting_evaluate_node(node, environment):
+        evaluated.append(node.text.decode())
+        return evaluate_node(node, environment)
+
+    def counting_call(self, interpreter, arguments):
+        evaluated.append(self.name)
+        return call(self, interpreter, arguments)
+
+    Interpreter.evaluate_node = staticmethod(counting_evaluate_node)
+    ExpressionBioledMethod.call = counting_call
+    try:
+        c = next(CSFile(source, global_env).get_classes())
+        # Fields are evaluated with the class, zero-arity members when they are first read
+        assert(sorted(evaluated) == sorted(['$"{Base}/share"', 'Root + "/api/Admin"', "Root"]))
+        root = "https://qa-share.transperfect.com/gl-share"
+        for _ in range(2):
+            assert(c.environment.get_variable("Root") == root)
+            assert(c.environment.get_variable("Base") == f"{root}/api/Admin")
+            assert(c.environment.get_variable("Share") == f"{root}/api/Admin/share")
+            assert(c.environment.get_variable("Endpoint") == f"{root}/api/Admin/share/disability")
+    finally:
+        Interpreter.evaluate_node = staticmethod(evaluate_node)
+        ExpressionBioledMethod.call = call
+
+    assert(sorted(evaluated) == sorted(["Endpoint", '$"{Base}/share"', 'Root + "/api/Admin"', "Root"]))
+
+
+def test_lazy_members_are_recomputed_when_a_dependency_changes():
+    source = """
+    public sealed class Admin : APITest
+    {
+        private string Base = "https://example.com";
+        private string Endpoint => $"{Base}/api";
+        private string Share => $"{Endpoint}/share";
+        private string Unrelated => $"{GlobalLabShare}/x";
+    }
+    """
+    env = next(CSFile(source, global_env).get_classes()).environment
+    assert("Share" not in env.values)
+    assert(env.get_variable("Share") == "https://example.com/api/share")
+    assert(env.get_variable("Unrelated") == "https://qa-share.transperfect.com/x")
+
+    env.assign_variable("Base", "http://localhost")
+    assert("Endpoint" not in env.values and "Share" not in env.values)
+    assert("Unrelated" in env.values)
+    assert(env.get_variable("Share") == "http://localhost/api/share")
+
+
+def test_members_are_called_in_the_class_scope():
+    # The test method's local Base must not change what the class's Base means inside EndpointFor
+    source = """
+    public sealed class Admin : APITest
+    {
+        private string Base = "https://example.com";
+        private string EndpointFor(string id) => $"{Base}/share/{id}";
+        [Test]
+        public void GET_Admin_200_1()
+        {
+            var Base = $"{GlobalLabShare}/local";
+            Send(Get(EndpointFor("1")));
+        }
+    }
+    """
+    c = next(CSFile(source, global_env).get_classes())
+    test = next(c.get_test_methods())
+    assert(test.method_environment.get_variable("Base") == "https://qa-share.transperfect.com/local")
+    assert(test.send_functions[0].evaluated_path == "https://example.com/share/1")
+
+
+def test_auto_properties():
+    source = """
+    public sealed class Admin : APITest
+    {
+        public static int PageSize { get; set; } = 50;
+        public string Share {get;set;} = $"{GlobalLabShare}/share";
+        public string Name { get; init; }
+        public string Computed { get { return "computed"; } }
+        private string Endpoint => $"{Share}/{PageSize}";
+    }
+    """
+    c = next(CSFile(source, global_env).get_classes())
+    assert(c.environment.get_variable("PageSize") == "50")
+    assert(c.environment.get_variable("Share") == "https://qa-share.transperfect.com/share")
+    assert(c.environment.get_variable("Name") == "")
+    assert("Computed" not in c.environment.values and "Computed" not in c.environment.lazy_values)
+    assert(c.environment.get_variable("Endpoint") == "https://qa-share.transperfect.com/share/50")
+
+
+def test_reparse_only_analyzes_what_changed():
+    source = """
+public sealed class Admin : APITest
+{
+    private string Endpoint => $"{GlobalLabShare}/gl-share/api/Admin";
+
+    [Test]
+    public void GET_Admin_200_1()
+    {
+        Send(Get(Endpoint));
+        Verify(Response.StatusCode).Is(OK);
+    }
+
+    [Test]
+    public void POST_Admin_201_2()
+    {
+        Send(Post(new { }).To(Endpoint));
+        Verify(Response.StatusCode).Is(Created);
+    }
+}
+
+public sealed class Info : APITest
+{
+    [Test]
+    public void GET_Info_200_3()
+    {
+        Send(Get("/api/Admin/info"));
+    }
+}
+"""
+    def sends(cs_file: CSFile) -> list:
+        return [(m.name, [(s.line_number, s.request_type, s.evaluated_path, s.verify_count_after, s.expected_code) for s in m.send_functions])
+                for c in cs_file.get_classes() for m in c.get_test_methods()]
+
+    cs_file = CSFile(source, global_env)
+    sends(cs_file)
+    admin, info = cs_file.get_classes()
+    get_admin, post_admin = admin.get_test_methods()
+
+    # An edit inside one method body, which also moves everything after it down a line
+    source = source.replace("Send(Get(Endpoint));", "Send(Get(Endpoint + \"/info\"));\n        Verify(Response.Content).IsNot(null);")
+    assert(cs_file.reparse(source))
+    assert(sends(cs_file) == sends(CSFile(source, global_env)))
+    assert(list(cs_file.get_classes()) == [admin, info])
+    new_get_admin, new_post_admin = admin.get_test_methods()
+    assert(new_get_admin is not get_admin and new_post_admin is post_admin)
+    assert(post_admin.node.start_point[0] == 13)
+
+    # An edit to a member outside the methods analyzes the class again, but not the other class
+    source = source.replace("/api/Admin\"", "/api/Admins\"")
+    cs_file.reparse(source)
+    assert(sends(cs_file) == sends(CSFile(source, global_env)))
+    new_admin, new_info = cs_file.get_classes()
+    assert(new_admin is not admin and new_info is info)
+    assert(cs_file.reparse(source) == [])
+
+
+def test_byte_sources():
+    with open("testfile.cs", 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    def sends(cs_file: CSFile) -> list:
+        return [(s.line_number, s.request_type, s.evaluated_path, s.verify_count_after, s.expected_code)
+                for c in cs_file.get_classes() for m in c.get_test_methods() for s in m.send_functions]
+
+    expected = sends(CSFile(text, global_env))
+    assert(expected)
+    source = text.encode()
+    assert(CSFile(source, global_env).source is source)
+    assert(sends(CSFile(source, global_env)) == expected)
+    assert(CSFile(memoryview(source), global_env).source is source)
+    assert(sends(CSFile(memoryview(source)[:], global_env)) == expected)
+    with tempfile.TemporaryFile() as f:
+        f.write(source)
+        f.flush()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            cs_file = CSFile(mapped, global_env)
+            assert(cs_file.line_index.line_starts == LineIndex(source).line_starts)
+            assert(sends(cs_file) == expected)
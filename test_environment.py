@@ -0,0 +1,170 @@
+import io
+import os
+import pickle
+import threading
+import operator
+import contextlib
+
+from cs import CSFile
+from Environment import Environment, FrozenEnvironment
+from extension import SwaggerAdder
+from Interpreter import Interpreter
+from Types import Callable
+from helper import create_globals, global_environment, globals
+
+
+def test_scope_lookups_follow_new_definitions():
+    globals_env = Environment()
+    globals_env.define_variable("GlobalLabShare", "https://global")
+    file_env = Environment(globals_env)
+    class_env = Environment(file_env)
+    method_env = Environment(class_env)
+
+    assert(method_env.get_variable("GlobalLabShare") == "https://global")
+    assert(method_env.get_variable("Missing") is None)
+
+    # Reassigned values are seen through the cached scope
+    globals_env.assign_variable("GlobalLabShare", "https://reassigned")
+    assert(method_env.get_variable("GlobalLabShare") == "https://reassigned")
+
+    # A name defined closer to the lookup shadows the cached scope
+    file_env.define_variable("GlobalLabShare", "https://file")
+    class_env.define_variable("Missing", "found")
+    assert(method_env.get_variable("GlobalLabShare") == "https://file")
+    assert(method_env.get_variable("Missing") == "found")
+    method_env.define_variable("GlobalLabShare", "https://method")
+    assert(method_env.get_variable("GlobalLabShare") == "https://method")
+    assert(class_env.get_variable("GlobalLabShare") == "https://file")
+
+
+def test_method_lookups_follow_new_definitions():
+    globals_env = Environment()
+    class_env = Environment(globals_env)
+    call_env = Environment(class_env)
+    assert(call_env.get_method("Helper") is None)
+    helper = Callable("Helper", "string", 1)
+    class_env.define_method("Helper", helper)
+    assert(call_env.get_method("Helper") is helper)
+
+
+def test_dependencies_are_recorded_per_thread():
+    env = Environment()
+    env.define_variable("a", 1)
+    env.define_variable("b", 2)
+    started, resume, looked_up = threading.Event(), threading.Event(), threading.Event()
+
+    def from_a():
+        started.set()
+        resume.wait(5)
+        value = env.get_variable("a")
+        looked_up.set()
+        return value
+
+    def from_b():
+        value = env.get_variable("b")
+        # from_a looks up its variable on the other thread while this one is being evaluated
+        resume.set()
+        looked_up.wait(5)
+        return value
+
+    env.define_lazy_variable("from_a", from_a)
+    env.define_lazy_variable("from_b", from_b)
+    thread = threading.Thread(target=env.get_variable, args=("from_a",))
+    thread.start()
+    started.wait(5)
+    assert(env.get_variable("from_b") == 2)
+    thread.join()
+    assert(env.get_variable("from_a") == 1)
+    assert(env.dependents["a"][env] == {"from_a"} and env.dependents["b"][env] == {"from_b"})
+
+
+def test_method_calls_are_memoized():
+    source = """
+    public sealed class Admin : APITest
+    {
+        private string Base = "https://example.com";
+        private string EndpointWithShareLink(string shareLink) => $"{Base}/share/{shareLink}";
+    }
+    """
+    env = next(CSFile(source, create_globals(globals)).get_classes()).environment
+    interpreter_env = Environment(env)
+    # A local variable of the caller does not leak into the method body
+    interpreter_env.define_variable("Base", "https://caller.com")
+    method = env.get_method("EndpointWithShareLink")
+    assert(method.call(Interpreter(interpreter_env), ["1"]) == "https://example.com/share/1")
+    assert(method.call(Interpreter(interpreter_env), ["1"]) == "https://example.com/share/1")
+    assert((env.call_cache.hits, env.call_cache.misses) == (1, 1))
+
+    # A new value of a variable the body reads is not served from the cache
+    env.assign_variable("Base", "http://localhost")
+    assert(method.call(Interpreter(interpreter_env), ["1"]) == "http://localhost/share/1")
+    assert(method.call(Interpreter(interpreter_env), ["2"]) == "http://localhost/share/2")
+    assert((env.call_cache.hits, env.call_cache.misses) == (1, 3))
+
+    # Definitions outside the scopes the method is defined in keep its memoized results
+    interpreter_env.define_variable("Other", "value")
+    Environment(create_globals(globals)).define_variable("Base", "https://unrelated.com")
+    assert(method.call(Interpreter(interpreter_env), ["2"]) == "http://localhost/share/2")
+    assert((env.call_cache.hits, env.call_cache.misses) == (2, 3))
+
+
+def test_frozen_globals_are_never_changed():
+    assert(isinstance(global_environment, FrozenEnvironment))
+    assert(global_environment == create_globals(globals).freeze())
+    assert(pickle.loads(pickle.dumps(global_environment)) == global_environment)
+    state = dict(global_environment.__dict__)
+    values = dict(global_environment.values)
+
+    for change in (lambda: global_environment.define_variable("GlobalLabShare", "changed"),
+                   lambda: global_environment.assign_variable("GlobalLabShare", "changed"),
+                   lambda: setattr(global_environment, "enclosing", Environment()),
+                   lambda: operator.setitem(global_environment.values, "GlobalLabShare", "changed")):
+        try:
+            change()
+            assert(False)
+        except TypeError:
+            pass
+
+    # Assigning a name defined nowhere fails as it does without frozen globals
+    for environment in (global_environment, Environment(Environment(global_environment)), Environment()):
+        try:
+            environment.assign_variable("Undefined", "value")
+            assert(False)
+        except Exception as error:
+            assert(str(error) == "Variable Undefined not found")
+
+    # Assigning a global from a file copies it into the file's environment
+    file_env = Environment(global_environment)
+    method_env = Environment(Environment(file_env))
+    method_env.assign_variable("GlobalLabShare", "https://file")
+    assert(method_env.get_variable("GlobalLabShare") == "https://file")
+    assert(file_env.values["GlobalLabShare"] == "https://file")
+    assert(Environment(global_environment).get_variable("GlobalLabShare") == values["GlobalLabShare"])
+
+    # Analyzing every file leaves the shared snapshot as it was
+    swagger_adder = SwaggerAdder("csfiles")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name in sorted(os.listdir("csfiles")):
+            with open(os.path.join("csfiles", name), 'r', encoding='utf-8') as f:
+                swagger_adder.analyze_source(f.read(), name)
+    assert(swagger_adder.globals is global_environment)
+    assert(global_environment.__dict__ == state and dict(global_environment.values) == values)
+
+
+def test_lazy_members_are_recomputed_when_a_global_is_assigned():
+    source = """
+    public sealed class Admin : APITest
+    {
+        private string Q => $"{ShareAPI}/q";
+        private string R => $"{Q}/r";
+    }
+    """
+    file_env = Environment(global_environment)
+    class_env = next(CSFile(source, file_env).get_classes()).environment
+    assert(class_env.get_variable("R") == "/api/Share/q/r")
+
+    # The global is copied into the file's environment, and what was computed from it is computed again
+    Environment(class_env).assign_variable("ShareAPI", "/override")
+    assert(class_env.get_variable("Q") == "/override/q")
+    assert(class_env.get_variable("R") == "/override/q/r")
+    assert(global_environment.get_variable("ShareAPI") == "/api/Share")
@@ -1,4 +1,118 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+import contextlib
+import tracemalloc
+
+from corpus import CorpusConfig, CorpusGenerator
 from extension import SwaggerAdder
+from scanner import FileScanner
+
+
+def peak_memory_streaming(root: str, files: int) -> int:
+    """Peak memory allocated by Python, in bytes, while streaming the summaries of a directory, checking each one."""
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for index, summary in enumerate(SwaggerAdder(root, dry_run="json", edits=devnull).stream()):
+            assert(len(summary.methods) == 2 and len(summary.changes) == 2)
+            method = summary.methods[0]
+            assert(method.class_name == f"Generated_{index}_0" and method.request_type is not None and method.code is not None)
+    assert(index + 1 == files)
+    return tracemalloc.get_traced_memory()[1] - start
 
 def test_environment():
-    swagger_adder = SwaggerAdder('testfile.cs')
\ No newline at end of file
+    swagger_adder = SwaggerAdder('testfile.cs')
+
+def test_dry_run():
+    with tempfile.TemporaryDirectory() as root:
+        for name in ("written", "diff", "json"):
+            shutil.copytree("csfiles", os.path.join(root, name))
+        sources = {name: open(os.path.join(root, "diff", name), 'rb').read() for name in os.listdir(os.path.join(root, "diff"))}
+        diff, edits = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()):
+            SwaggerAdder(os.path.join(root, "written")).process_all()
+            SwaggerAdder(os.path.join(root, "diff"), dry_run="diff", edits=diff).process_all()
+            SwaggerAdder(os.path.join(root, "json"), dry_run="json", edits=edits).process_all(jobs=2)
+
+        # Nothing is written in a dry run, and the edits describe exactly what a real run writes
+        assert(diff.getvalue().count("\n--- a/") + 1 == len(edits.getvalue().splitlines()))
+        for line in edits.getvalue().splitlines():
+            file_edits = json.loads(line)
+            name = os.path.basename(file_edits["file"])
+            assert(open(os.path.join(root, "json", name), 'rb').read() == sources[name])
+            edited = SwaggerAdder.apply_edits(sources[name], [(edit["offset"], edit["text"]) for edit in file_edits["edits"]])
+            assert(edited == open(os.path.join(root, "written", name), 'rb').read())
+            assert(f"+++ b/{file_edits['file'].replace('/json/', '/diff/')}\n" in diff.getvalue())
+
+
+def test_parallel_runs_match_sequential_runs():
+    with tempfile.TemporaryDirectory() as root:
+        # The walk yields a/ before a-b/, though a-b/x.cs sorts before a/x.cs as a full path
+        for directory in ("a", "a-b", "a/nested"):
+            shutil.copytree("csfiles", os.path.join(root, directory))
+        results, edits = {}, {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for jobs in (1, 2):
+                edits[jobs] = io.StringIO()
+                results[jobs] = SwaggerAdder(root, dry_run="json", edits=edits[jobs]).process_all(jobs=jobs)
+
+        assert(results[1] == results[2])
+        assert(edits[1].getvalue() == edits[2].getvalue())
+        assert([file_path for file_path, _ in results[1]] == list(FileScanner().scan(root)))
+        assert(any(changes for _, changes in results[1]))
+
+
+def test_crlf_files_keep_their_line_endings():
+    with tempfile.TemporaryDirectory() as root:
+        file_path = os.path.join(root, "AdminInfo.cs")
+        with open("csfiles/AdminInfo_.cs", 'rb') as f:
+            source = f.read().replace(b"    [Swagger(Path = Paths.AdminInfo, Operation = OperationType.GET, ResponseCode = 200)]\n", b"")
+        source = source.replace(b"\n", b"\r\n")
+        with open(file_path, 'wb') as f:
+            f.write(source)
+        with contextlib.redirect_stdout(io.StringIO()):
+            changes = SwaggerAdder(file_path).process_file(file_path).changes
+        assert(len(changes) == 1)
+        with open(file_path, 'rb') as f:
+            written = f.read()
+        # The attribute and the two using directives
+        assert(written.count(b"\n") == written.count(b"\r\n") == source.count(b"\r\n") + 3)
+
+
+def test_attribute_goes_above_the_declaration_after_comments():
+    with tempfile.TemporaryDirectory() as root:
+        file_path = os.path.join(root, "AdminInfo.cs")
+        with open("csfiles/AdminInfo_.cs", 'rb') as f:
+            source = f.read().replace(b"    [Swagger(Path = Paths.AdminInfo, Operation = OperationType.GET, ResponseCode = 200)]\n", b"")
+        source = source.replace(b"    [Test]\n", b"    [Test]\n    // Needs admin\n")
+        with open(file_path, 'wb') as f:
+            f.write(source)
+        with contextlib.redirect_stdout(io.StringIO()):
+            SwaggerAdder(file_path).process_file(file_path)
+        with open(file_path, 'rb') as f:
+            written = f.read()
+        lines = written.decode().splitlines()
+        declaration = lines.index("    public void GET_AdminInfo_ValidResponse_200_125388()")
+        # Directly above the declaration, as without the comment, not between [Test] and the comment
+        assert(lines[declaration - 1].startswith("    [Swagger(Path = Paths.AdminInfo"))
+        assert(lines[declaration - 4:declaration - 1] == ["    // Needs admin", "    [Data.SetUp(Tokens.TokenAdminAPI)]",
+                                                          "    [Recycle(Recycled.TokenAdminAPI)]"])
+
+
+def test_streaming_memory_stays_flat():
+    with tempfile.TemporaryDirectory() as small, tempfile.TemporaryDirectory() as large:
+        CorpusGenerator(CorpusConfig(files=100, methods_per_class=2, sends_per_method=1)).write(small)
+        CorpusGenerator(CorpusConfig(files=300, methods_per_class=2, sends_per_method=1)).write(large)
+        # The first run fills the process-wide caches
+        peak_memory_streaming(small, 100)
+        tracemalloc.start()
+        try:
+            small_peak = peak_memory_streaming(small, 100)
+            large_peak = peak_memory_streaming(large, 300)
+        finally:
+            tracemalloc.stop()
+    # Keeping each parsed file would take about 100 KiB per file, some 20 MiB more for the larger corpus
+    assert(large_peak - small_peak < 4 * 2**20)
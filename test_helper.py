@@ -0,0 +1,43 @@
+from helper import PathResolver, paths
+
+
+def test_path_resolver_trie():
+    path_resolver = PathResolver(paths + """
+        public const string OverlapById = "/api/Overlap/{id}/email";
+        public const string OverlapUser = "/api/Overlap/user/{name}";
+        public const string OverlapFile = "/api/Overlap/file{id}.json";
+    """)
+    assert(path_resolver.get_var_for_path("https://qa-share.transperfect.com/gl-share/api/Admin/share/1?api-version=1") == "AdminShareSharelinkid")
+    assert(path_resolver.get_var_for_path("/api/Files/a2a/status/shareGroup.Share.Id/op") == "FilesA2aStatusSharelinkidA2aoperationid")
+    assert(path_resolver.get_var_for_path("/api/Share/setup") == "ShareSetup")
+    # When several templates match, the one declared first wins
+    assert(path_resolver.get_var_for_path("/api/Overlap/user/email") == "OverlapById")
+    assert(path_resolver.get_var_for_path("/api/Overlap/user/bob") == "OverlapUser")
+    assert(path_resolver.get_var_for_path("/api/Overlap/file12.json") == "OverlapFile")
+    # A {param} never matches an empty segment
+    assert(path_resolver.get_var_for_path("/api/Admin/share//disability") is None)
+    assert(path_resolver.get_var_for_path("/api/Unknown/1") is None)
+
+
+def test_path_resolver_lookup_cache():
+    path_resolver = PathResolver(paths)
+    path_resolver.LOOKUP_CACHE_SIZE = 2
+    for path in ["/api/Admin/share/1", "/api/Unknown", "/api/Admin/share/1", "/api/Share/2"]:
+        path_resolver.get_var_for_path(path)
+    assert(list(path_resolver._lookup_cache) == ["/api/Admin/share/1", "/api/Share/2"])
+    assert(path_resolver.get_var_for_path("/api/Admin/share/1") == "AdminShareSharelinkid")
+
+
+def test_path_resolver_caches_unknown_paths():
+    path_resolver = PathResolver(paths)
+    lookups = []
+    get_var_for_path = path_resolver._get_var_for_path
+
+    def counting_get_var_for_path(path):
+        lookups.append(path)
+        return get_var_for_path(path)
+
+    path_resolver._get_var_for_path = counting_get_var_for_path
+    for _ in range(3):
+        assert(path_resolver.get_var_for_path("/api/Unknown") is None)
+    assert(lookups == ["/api/Unknown"])
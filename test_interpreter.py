@@ -0,0 +1,69 @@
+from cs import CSFile
+from Environment import Environment
+from Interpreter import Interpreter
+from helper import create_globals, globals
+
+global_env: Environment = create_globals(globals)
+
+
+def class_environment() -> Environment:
+    with open("testfile.cs", "r") as file:
+        cs_file = CSFile(file.read(), global_env)
+    return next(cs_file.get_classes()).environment
+
+
+def test_evaluate():
+    env = class_environment()
+    endpoint = "https://qa-share.transperfect.com/gl-share/api/Admin/share"
+    assert(Interpreter.evaluate(None, "Endpoint", env) == endpoint)
+    assert(Interpreter.evaluate(None, '$"{EndpointWithShareLink(shareGroup.Share.Id)}/disability"', env) == f"{endpoint}/shareGroup.Share.Id/disability")
+    assert(Interpreter.evaluate(None, '$"{Endpoint}" + "/x" + APIVersion', env) == f"{endpoint}/x?api-version=1")
+    assert(Interpreter.evaluate(None, "EndpointWithParameters(1, 2)", env) == "https://qa-share.transperfect.com/gl-share/api/Admin/users/pricing/1/2")
+    assert(Interpreter.evaluate(None, "Unknown(Endpoint)", env) == "Unknown(Endpoint)")
+    assert(Interpreter.evaluate(None, "unknownVariable", env) == "unknownVariable")
+    assert(Interpreter.evaluate(None, '"literal"', env) == '"literal"')
+    assert(Interpreter.evaluate(None, "TRUE", env) == "TRUE")
+    assert(Interpreter.evaluate(None, "  ", env) == "")
+
+
+def test_compiled_expressions_are_cached():
+    env = class_environment()
+    compiled = Interpreter.compile('$"{Endpoint}/abc"')
+    assert(Interpreter.compile(' $"{Endpoint}/abc" ') is compiled)
+    assert(compiled(env) == Interpreter.evaluate(None, '$"{Endpoint}/abc"', env))
+
+    # Expression-bodied members are compiled from their node when the class is parsed
+    method = env.get_method("EndpointWithShareLink")
+    assert(method is not None)
+    assert(method.compiled_body is not None)
+    assert(method.call(Interpreter(env), ["1"]) == Interpreter.compile(method.expression_body)(method_env(env, shareLink="1")))
+
+
+def method_env(enclosing: Environment, **values) -> Environment:
+    env = Environment(enclosing)
+    for name, value in values.items():
+        env.define_variable(name, value)
+    return env
+
+
+def test_evaluate_from_nodes():
+    source = """
+    public sealed class Admin : APITest
+    {
+        private string Plus = "a+b" + APIVersion;
+        private string Braces = $"{{literal}}/{GlobalLabShare}";
+        private string Version = $"{Plus}" + "/v";
+        [Test]
+        public void GET_Admin_200_1()
+        {
+            Send(Get($"{GlobalLabShare}/x+y/{Plus}" + APIVersion));
+        }
+    }
+    """
+    cs_file = CSFile(source, global_env)
+    c = next(cs_file.get_classes())
+    assert(c.environment.get_variable("Plus") == "a+b?api-version=1")
+    assert(c.environment.get_variable("Braces") == "{literal}/https://qa-share.transperfect.com")
+    assert(c.environment.get_variable("Version") == "a+b?api-version=1/v")
+    send = next(c.get_test_methods()).send_functions[0]
+    assert(send.evaluated_path == "https://qa-share.transperfect.com/x+y/a+b?api-version=1?api-version=1")
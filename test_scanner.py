@@ -0,0 +1,54 @@
+import os
+import tempfile
+
+from scanner import FileScanner
+
+
+def write(root: str, relative_path: str, content: str):
+    path = os.path.join(root, *relative_path.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def test_scanner_filters():
+    with tempfile.TemporaryDirectory() as root:
+        api_test = "public sealed class A : APITest {}"
+        write(root, "b/Second.cs", api_test)
+        write(root, "a/First.cs", api_test)
+        write(root, "a/Helper.cs", "public static class Helper {}")
+        write(root, "a/bin/Debug/Copy.cs", api_test)
+        write(root, "obj/Generated.cs", api_test)
+        write(root, "a/Notes.txt", api_test)
+        write(root, "a/Huge.cs", api_test + " " * 100)
+        write(root, "c/Skip.cs", api_test)
+
+        scanner = FileScanner(exclude=FileScanner.DEFAULT_EXCLUDE + ["c/*"], max_size=50)
+        found = [os.path.relpath(path, root).replace(os.sep, '/') for path in scanner.scan(root)]
+
+        assert(found == ["a/First.cs", "b/Second.cs"])
+        assert(scanner.skipped == {"excluded": 3, "not included": 1, "too large": 1, "no marker": 1})
+        assert(scanner.scanned == 2)
+
+
+def test_scanner_walks_directories_in_name_order():
+    with tempfile.TemporaryDirectory() as root:
+        api_test = "public sealed class A : APITest {}"
+        for relative_path in ("a/x.cs", "a-b/x.cs", "a/b/x.cs", "a/y.cs"):
+            write(root, relative_path, api_test)
+        found = [os.path.relpath(path, root).replace(os.sep, '/') for path in FileScanner().scan(root)]
+        assert(found == ["a/b/x.cs", "a/x.cs", "a/y.cs", "a-b/x.cs"])
+
+
+def test_scanner_passes_on_what_it_read():
+    with tempfile.TemporaryDirectory() as root:
+        api_test = "public sealed class A : APITest {}"
+        write(root, "a/First.cs", api_test)
+        assert([source for _, source in FileScanner().scan_sources(root)] == [api_test.encode()])
+        # Without a marker, files are not read at all
+        assert([source for _, source in FileScanner(marker=None).scan_sources(root)] == [None])
+
+
+def test_scanner_yields_a_file_given_directly():
+    scanner = FileScanner()
+    assert(list(scanner.scan("failing.cs")) == ["failing.cs"])
@@ -0,0 +1,57 @@
+from cs import CSFile
+from extension import SwaggerAdder
+from helper import create_globals, globals
+from status_codes import status_code
+
+
+def test_status_code_forms():
+    assert(status_code("OK") == "200")
+    assert(status_code("HttpStatusCode.Accepted") == "202")
+    assert(status_code("System.Net.HttpStatusCode.UnprocessableEntity") == "422")
+    assert(status_code("(int)HttpStatusCode.TooManyRequests") == "429")
+    assert(status_code("(HttpStatusCode)409") == "409")
+    assert(status_code("  503 ") == "503")
+    assert(status_code("notfound") == "404")
+    assert(status_code("HttpStatusCode.Teapot") is None)
+    assert(status_code("expectedCode") is None)
+    assert(status_code("4040") is None)
+    assert(status_code(None) is None)
+
+
+def test_verify_status_codes():
+    source = """
+    public sealed class Admin : APITest
+    {
+        [Test]
+        public void POST_Admin_Accepted_1()
+        {
+            Send(Post<Item>(new { }).To(Endpoint));
+            Verify(Response.StatusCode).Is((int)HttpStatusCode.Accepted);
+            Send(Get(Endpoint));
+            Verify(Response.StatusCode).Is(expectedCode);
+        }
+    }
+    """
+    cs_file = CSFile(source, create_globals(globals))
+    m = next(next(cs_file.get_classes()).get_test_methods())
+    assert([s.expected_code for s in m.send_functions] == ["202", None])
+
+
+def test_parse_method_name():
+    swagger_adder = SwaggerAdder('testfile.cs')
+    assert(swagger_adder.parse_method_name("GET_Share_NotFound_49482") == ("Get", "404"))
+    assert(swagger_adder.parse_method_name("POST_Share_Conflict_409_1") == ("Post", "409"))
+    # A number in the name wins over a word that happens to be a status name
+    assert(swagger_adder.parse_method_name("GET_Files_Found_Gone_200_1") == ("Get", "200"))
+    assert(swagger_adder.parse_method_name("Cleanup_Share") == (None, None))
+    assert(swagger_adder.parse_method_name("DELETE_Share_TooManyRequests") == ("Delete", "429"))
+    assert(swagger_adder.parse_method_name("GET_Share_Ok_12") == ("Get", "200"))
+    assert(swagger_adder.parse_method_name("POST_Share_Conflict_1") == ("Post", "409"))
+    assert(swagger_adder.parse_method_name("DELETE_Share_GONE_1") == ("Delete", "410"))
+    assert(swagger_adder.parse_method_name("GET_Share_notfound_1") == ("Get", "404"))
+    # Names are only read in the code position, and not when they are ordinary words
+    assert(swagger_adder.parse_method_name("GET_Share_Moved_123456") == ("Get", None))
+    assert(swagger_adder.parse_method_name("GET_Share_Moved_1") == ("Get", None))
+    assert(swagger_adder.parse_method_name("GET_Share_Found_1") == ("Get", None))
+    assert(swagger_adder.parse_method_name("GET_Gone_200_1") == ("Get", "200"))
+    assert(swagger_adder.parse_method_name("GET_NotFound_Share_1") == ("Get", None))
@@ -0,0 +1,67 @@
+import io
+import os
+import tempfile
+import contextlib
+
+from extension import SwaggerAdder
+from watch import WatchedFile, poll
+
+
+def test_watched_file_follows_saves():
+    source = """public sealed class Admin : APITest
+{
+    private string Endpoint => $"{GlobalLabShare}/gl-share/api/Admin/info";
+
+    [Test]
+    public void GET_AdminInfo_200_1()
+    {
+        Send(Get(Endpoint));
+        Verify(Response.StatusCode).Is(OK);
+    }
+}
+"""
+    with tempfile.TemporaryDirectory() as root:
+        file_path = os.path.join(root, "Admin.cs")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        swagger_adder = SwaggerAdder(file_path)
+        watched_file = WatchedFile(file_path, swagger_adder)
+        assert(watched_file.changed())
+        assert(watched_file.update() == swagger_adder.analyze_source(source, file_path))
+        assert(not watched_file.changed())
+
+        source = source.replace("Is(OK)", "Is(Unauthorized)").replace("    [Test]", "    // Needs a token\n    [Test]")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write(source)
+        assert(watched_file.changed())
+        line_changes, changes = watched_file.update()
+        assert((line_changes, changes) == swagger_adder.analyze_source(source, file_path))
+        assert(changes == ["GET_AdminInfo_200_1: [Swagger(Path = Paths.AdminInfo, Operation = OperationType.Get, ResponseCode = 401)]"])
+
+
+def test_deleted_files_stop_being_watched():
+    with tempfile.TemporaryDirectory() as root:
+        file_paths = [os.path.join(root, name) for name in ("Kept.cs", "Deleted.cs")]
+        for file_path in file_paths:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write("public sealed class Admin : APITest {}")
+        swagger_adder = SwaggerAdder(root)
+        watched = {file_path: WatchedFile(file_path, swagger_adder) for file_path in file_paths}
+        with contextlib.redirect_stdout(io.StringIO()):
+            poll(watched)
+        assert(not any(watched_file.changed() for watched_file in watched.values()))
+
+        # Gone when its change is checked
+        os.remove(file_paths[1])
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            poll(watched)
+        assert(list(watched) == [file_paths[0]])
+        assert(output.getvalue() == f"{file_paths[1]}: no longer readable, stopped watching\n")
+
+        # Replaced by a directory, which can be checked but not read
+        os.remove(file_paths[0])
+        os.mkdir(file_paths[0])
+        with contextlib.redirect_stdout(io.StringIO()):
+            poll(watched)
+        assert(watched == {})
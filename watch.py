@@ -0,0 +1,82 @@
+import os
+import time
+import weakref
+from collections.abc import Callable, Iterable
+from cs import CSFile, CSMethod
+from extension import Decisions, SwaggerAdder
+from summary import MethodSummary
+
+
+class WatchedFile:
+    """
+    A file whose Swagger suggestions are kept up to date as it is saved.
+    The parsed CSFile is kept between saves and reparsed incrementally from its previous tree,
+    so only the classes and methods whose text changed are analyzed again.
+    """
+    def __init__(self, file_path: str, swagger_adder: SwaggerAdder):
+        self.file_path = file_path
+        self.swagger_adder = swagger_adder
+        self.cs_file: CSFile | None = None
+        self.stamp: tuple[int, int] | None = None
+        # The summary decided for each method, dropped with the methods that reparsing replaces
+        self.summaries: weakref.WeakKeyDictionary[CSMethod, MethodSummary] = weakref.WeakKeyDictionary()
+
+    def changed(self) -> bool:
+        """Whether the file was saved since it was last read."""
+        stat = os.stat(self.file_path)
+        return (stat.st_mtime_ns, stat.st_size) != self.stamp
+
+    def update(self) -> Decisions:
+        """Read the file and decide its Swagger attributes again."""
+        stat = os.stat(self.file_path)
+        with open(self.file_path, 'rb') as f:
+            source = f.read()
+        self.stamp = (stat.st_mtime_ns, stat.st_size)
+
+        adder = self.swagger_adder
+        if self.cs_file is None:
+            self.cs_file = CSFile(source, adder.globals, adder.parser)
+        else:
+            self.cs_file.reparse(source, adder.parser)
+        return adder.decide(self.cs_file, self.file_path, self.summaries)
+
+
+def poll(watched: dict[str, WatchedFile]):
+    """Print the suggestions of each watched file saved since the last poll, and stop watching the files that are gone."""
+    for file_path, watched_file in list(watched.items()):
+        try:
+            if not watched_file.changed():
+                continue
+            started = time.perf_counter()
+            _, changes = watched_file.update()
+        except OSError:
+            # Deleted or renamed between polls: the next rescan watches it again if it is back
+            del watched[file_path]
+            print(f"{file_path}: no longer readable, stopped watching")
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{file_path}: {len(changes)} suggestions ({elapsed:.1f} ms)")
+        for change in changes:
+            print(f"    {change}")
+
+
+def watch(scan: Callable[[], Iterable[str]], swagger_adder: SwaggerAdder, interval: float = 0.2, rescan_interval: float = 5.0):
+    """
+    Print the suggested attributes of each file when watching starts and whenever it is saved, until interrupted.
+    scan() is called again every rescan_interval seconds to watch the files added, or back after being moved away.
+    """
+    watched: dict[str, WatchedFile] = {}
+    last_scan = None
+    try:
+        while True:
+            if last_scan is None or time.monotonic() - last_scan >= rescan_interval:
+                for file_path in scan():
+                    if file_path not in watched:
+                        watched[file_path] = WatchedFile(file_path, swagger_adder)
+                if last_scan is None:
+                    print(f"Watching {len(watched)} files, press Ctrl+C to stop")
+                last_scan = time.monotonic()
+            poll(watched)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass